@@ -213,4 +213,26 @@ res = {'times': '1', 'label': 'foo', 'trx': [], 'type': 'osmo-bts-trx'}
 schema.combine(a, b)
 assert a == res
 
+print('- Overlay many:')
+a = { 'a': {'x': '1', 'l': [{'y': '1'}]}, 'b': '1' }
+b = { 'a': {'x': '2', 'l': [{'z': '2'}, {'w': '2'}]} }
+c = { 'a': {'l': [{'y': '3'}]}, 'c': '3' }
+res = {'a': {'x': '2', 'l': [{'y': '3', 'z': '2'}, {'w': '2'}]}, 'b': '1', 'c': '3'}
+config.overlay_many(a, b, c)
+assert a == res
+a = { 'a': {'x': '1'} }
+try:
+    config.overlay_many(a, {'a': {'x': '2'}}, {'a': ['y']})
+except ValueError:
+    print("ValueError expected")
+
+print('- Overlay many from:')
+a = { 'a': {'x': '1', 'l': [{'y': '1'}]}, 'b': '1' }
+b = { 'a': {'x': '2', 'l': [{'z': '2'}, {'w': '2'}]} }
+c = { 'a': {'l': [{'y': '3'}]}, 'c': '3' }
+config.overlay_many_from(a, b, c)
+assert a == res
+a['a']['l'][1]['w'] = '4'
+assert b == { 'a': {'x': '2', 'l': [{'z': '2'}, {'w': '2'}]} }
+
 # vim: expandtab tabstop=4 shiftwidth=4
@@ -148,4 +148,77 @@ except log.OriginLoopError:
     print('disallowed successfully')
     pass
 
+print('- Testing log.is_enabled()')
+log.set_level(log.C_TST, log.L_LOG)
+t = LogTest('is_enabled')
+print(log.is_enabled(log.C_TST, log.L_LOG), log.is_enabled(log.C_TST, log.L_DBG), t.is_dbg_enabled())
+log.set_level(log.C_TST, log.L_DBG)
+print(log.is_enabled(log.C_TST, log.L_LOG), log.is_enabled(log.C_TST, log.L_DBG), t.is_dbg_enabled())
+
+print('- Testing early exit when no target logs a level')
+log.set_level(log.C_TST, log.L_LOG)
+log.set_level(log.C_DEFAULT, log.L_LOG)
+print(log._any_target_would_log(log.L_LOG), log._any_target_would_log(log.L_DBG))
+t.dbg('not logged')
+log.set_level(log.C_DEFAULT, log.L_DBG)
+print(log._any_target_would_log(log.L_LOG), log._any_target_would_log(log.L_DBG))
+
+print('- Testing ancestry_str() follows renames and reparenting')
+p = LogTest('parent')
+c = LogTest('child')
+c._set_parent(p)
+print(c.ancestry_str())
+p.set_name('renamed')
+print(c.ancestry_str())
+c._set_parent(None)
+print(c.ancestry_str())
+
+print('- Invalid categories are rejected when set')
+try:
+    log.set_level('invalid', log.L_DBG)
+except RuntimeError as e:
+    print(e)
+
+print('- Testing log.ctx_scope()')
+class CtxScopeTest(log.Origin):
+    def __init__(self):
+        super().__init__(log.C_TST, 'ctx_scope_test')
+
+    def run(self):
+        try:
+            with log.ctx_scope('outer'):
+                with log.ctx_scope(key='inner'):
+                    raise ValueError('bork')
+        except ValueError:
+            log.log_exn()
+        with log.ctx_scope('left'):
+            pass
+        self.log('no ctx left behind')
+
+CtxScopeTest().run()
+
+print('- Testing dbg() becomes a no-op without any debug target')
+log.set_level(log.C_TST, log.L_LOG)
+log.set_level(log.C_DEFAULT, log.L_LOG)
+print(log.DBG_ENABLED, t.is_dbg_enabled())
+t.dbg('not logged')
+log.dbg('not logged either')
+log.set_level(log.C_TST, log.L_DBG)
+print(log.DBG_ENABLED, t.is_dbg_enabled())
+t.dbg('logged again')
+
+print('- Testing log_exn() on a log.Error')
+class ErrorTest(log.Origin):
+    def __init__(self):
+        super().__init__(log.C_TST, 'error_test')
+
+    def run(self):
+        try:
+            with log.ctx_scope('scope'):
+                raise log.Error('failed')
+        except log.Error:
+            log.log_exn()
+
+ErrorTest().run()
+
 # vim: expandtab tabstop=4 shiftwidth=4
@@ -39,6 +39,8 @@ pprint.pprint(
     resource.solve([ [0, 1, 2],
                      [2],
                      [0, 2] ]) ) # == [1, 2, 0]
+pprint.pprint(
+    resource.solve([ list(range(8)) ] * 7 + [ [0] ]) ) # == [1, 2, 3, 4, 5, 6, 7, 0]
 
 print('- expect failure to solve:')
 try:
@@ -129,6 +131,41 @@ subset =  { 'unordered_list_set': [4] }
 if not resource.item_matches(superset, subset):
     print('4th subset should not match, pass')
 
+print('- get(), put() and get() again:')
+# two identical modems share the same hash
+reserved = resource.Resources({
+    'modem': [ { '_hash': 'aaa', 'label': 'm' }, { '_hash': 'aaa', 'label': 'm' }, { '_hash': 'bbb', 'label': 'n' } ],
+    })
+rres = resource.ReservedResources(pool, origin, reserved, {})
+def used():
+    return [bool(item.get(resource.USED_KEY)) for item in rres.reserved['modem']]
+log.set_all_levels(log.L_ERR)
+m1 = rres.get('modem', { 'label': 'm' })
+m2 = rres.get('modem', { 'label': 'm' })
+print(used())
+rres.put(m2)
+print(used())
+m3 = rres.get('modem', { 'label': 'm' })
+print(m3[resource.HASH_KEY] == m2[resource.HASH_KEY])
+print(used())
+rres.put_all()
+print(used())
+log.set_all_levels(log.L_DBG)
+
+print('- next_msisdn_range():')
+msisdn_file = state_dir.child('last_used_msisdn.state')
+if os.path.exists(msisdn_file):
+    os.remove(msisdn_file)
+print(pool.next_msisdn_range(origin, 0))
+print(os.path.exists(msisdn_file))
+print(pool.next_msisdn_range(origin, 3))
+with open(msisdn_file, 'r') as f:
+    print(f.read())
+print(pool.next_msisdn(origin))
+print(pool.next_msisdn_range(origin, 0))
+with open(msisdn_file, 'r') as f:
+    print(f.read())
+
 print('*** concurrent allocation:')
 origin1 = log.Origin(None, 'testowner1')
 origin2 = log.Origin(None, 'testowner2')
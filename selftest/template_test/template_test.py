@@ -4,6 +4,7 @@ import _prep
 
 import sys
 import os
+import io
 
 from osmo_gsm_tester.core import template, log
 
@@ -82,6 +83,11 @@ vals = dict(nitb=dict(
 
 print(template.render('osmo-nitb.cfg', vals))
 
+print('- Testing: render to file same as render')
+f = io.StringIO()
+template.render_to_file('osmo-nitb.cfg', vals, f)
+assert f.getvalue() == template.render('osmo-nitb.cfg', vals)
+
 print('- Testing: expect to fail on invalid templates dir')
 try:
     template.set_templates_dir('non-existing dir')
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import _prep
 
-from osmo_gsm_tester.core.util import hash_obj
+import os
+
+from osmo_gsm_tester.core.util import hash_obj, Dir, get_tempdir, duration2sec
 
 print('- expect the same hashes on every test run')
 print(hash_obj('abc'))
@@ -9,3 +11,17 @@ print(hash_obj(1))
 print(hash_obj([1, 2, 3]))
 print(hash_obj({ 'k': [ {'a': 1, 'b': 2}, {'a': 3, 'b': 4}, ],
                  'i': [ {'c': 1, 'd': 2}, {'c': 3, 'd': 4}, ] }))
+
+print('- Dir.new_dir() picks a non-existing name')
+d = Dir(get_tempdir())
+print([os.path.basename(d.new_dir('sub', 'name.ext')) for i in range(3)])
+print(os.path.basename(d.new_child('sub', 'name.ext')))
+d.touch('afile')
+print(os.path.basename(d.new_dir('afile')))
+
+print('- duration2sec() converts minutes and hours')
+print([duration2sec(val) for val in ('90', '5m', '2h', 30)])
+try:
+    duration2sec('5s')
+except ValueError as e:
+    print(e)
@@ -183,11 +183,16 @@ def get_scenarios_dirs():
     return [Dir(d) for d in get_main_config_value(CFG_SCENARIOS_DIR)]
 
 DEFAULTS_CONF = None
-def get_defaults(for_kind):
+def get_defaults(for_kind, do_copy=True):
+    '''Return the defaults.conf section for_kind. Pass do_copy=False to only
+    look up values in it without paying for a deep copy, the returned dict
+    must not be modified then.'''
     global DEFAULTS_CONF
     if DEFAULTS_CONF is None:
         DEFAULTS_CONF = read_config_file(CFG_DEFAULTS_CONF, if_missing_return={})
     defaults = DEFAULTS_CONF.get(for_kind, {})
+    if not do_copy:
+        return defaults
     return copy.deepcopy(defaults)
 
 def read(path, validation_schema=None, if_missing_return=False):
@@ -201,10 +206,20 @@ def read(path, validation_schema=None, if_missing_return=False):
         schema.validate(config, validation_schema)
     return config
 
-def write(path, config):
+def write(path, config, standardized=False):
+    '''Write config to path as YAML. If config is known to be in standardized
+    form already, i.e. only made up of values as returned by read(), pass
+    standardized=True to skip the YAML round trip of converting it again.
+    The file is replaced in one go, so readers never see it half written.'''
     log.ctx(path)
-    with open(path, 'w') as f:
-        f.write(tostr(config))
+    if standardized:
+        config_str = _tostr(config)
+    else:
+        config_str = tostr(config)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(config_str)
+    os.replace(tmp_path, path)
 
 def fromstr(config_str, validation_schema=None):
     config = yaml.safe_load(config_str)
@@ -238,22 +253,78 @@ def overlay(dest, src):
             raise ValueError('cannot combine dict with a value of type: %r' % type(src))
 
         for key, val in src.items():
-            log.ctx(key=key)
-            dest_val = dest.get(key)
-            dest[key] = overlay(dest_val, val)
+            with log.ctx_scope(key=key):
+                dest[key] = overlay(dest.get(key), val)
         return dest
     if is_list(dest):
         if not is_list(src):
             raise ValueError('cannot combine list with a value of type: %r' % type(src))
         copy_len = min(len(src),len(dest))
         for i in range(copy_len):
-            log.ctx(idx=i)
-            dest[i] = overlay(dest[i], src[i])
+            with log.ctx_scope(idx=i):
+                dest[i] = overlay(dest[i], src[i])
         for i in range(copy_len, len(src)):
             dest.append(src[i])
         return dest
     return src
 
+def overlay_from(dest, src):
+    '''
+    Same as overlay(dest, copy.deepcopy(src)), but only copying those parts of
+    src that end up in dest as-is, instead of copying all of src up front. src
+    is never modified and dest never shares dicts or lists with it.
+    '''
+    if is_dict(dest):
+        if not is_dict(src):
+            raise ValueError('cannot combine dict with a value of type: %r' % type(src))
+
+        for key, val in src.items():
+            with log.ctx_scope(key=key):
+                dest[key] = overlay_from(dest.get(key), val)
+        return dest
+    if is_list(dest):
+        if not is_list(src):
+            raise ValueError('cannot combine list with a value of type: %r' % type(src))
+        copy_len = min(len(src),len(dest))
+        for i in range(copy_len):
+            with log.ctx_scope(idx=i):
+                dest[i] = overlay_from(dest[i], src[i])
+        for i in range(copy_len, len(src)):
+            dest.append(copy.deepcopy(src[i]))
+        return dest
+    if is_dict(src) or is_list(src):
+        return copy.deepcopy(src)
+    return src
+
+def overlay_many(dest, *srcs):
+    '''
+    Same as calling overlay(dest, src) for each of srcs in order, but dict
+    keys present in several srcs are walked only once, overlaying all their
+    values in one go.
+    '''
+    return _overlay_many(overlay, dest, srcs)
+
+def overlay_many_from(dest, *srcs):
+    '''
+    Same as overlay_many(), but copying like overlay_from() does: srcs are
+    never modified and dest never shares dicts or lists with them.
+    '''
+    return _overlay_many(overlay_from, dest, srcs)
+
+def _overlay_many(overlay_func, dest, srcs):
+    if len(srcs) > 1 and is_dict(dest) and all(is_dict(src) for src in srcs):
+        keys = {}
+        for src in srcs:
+            for key in src:
+                keys[key] = None
+        for key in keys:
+            with log.ctx_scope(key=key):
+                dest[key] = _overlay_many(overlay_func, dest.get(key), [src[key] for src in srcs if key in src])
+        return dest
+    for src in srcs:
+        dest = overlay_func(dest, src)
+    return dest
+
 def replicate_times(d):
     '''
     replicate items that have a "times" > 1
@@ -22,9 +22,11 @@ import sys
 import time
 import traceback
 import atexit
+import linecache
 import re
+import itertools
+import threading
 from datetime import datetime # we need this for strftime as the one from time doesn't carry microsecond info
-from inspect import getframeinfo, stack
 
 from .util import is_dict
 
@@ -55,6 +57,15 @@ def dbg(*messages, _origin=None, _category=None, _src=None, **named_items):
     '''Log on debug level. See also log()'''
     _log(messages, named_items, origin=_origin, category=_category, level=L_DBG, src=_src)
 
+# The real dbg(), while no target logs debug messages at all, dbg() is replaced
+# by a no-op, see _update_dbg_enabled(). Check DBG_ENABLED before building
+# expensive debug messages.
+_dbg = dbg
+DBG_ENABLED = False
+
+def _dbg_disabled(*messages, **named_items):
+    pass
+
 def log(*messages, _origin=None, _category=None, _level=L_LOG, _src=None, **named_items):
     '''Log a message. The origin, an Origin class instance, is normally
     determined by stack magic, only pass _origin to override. The category is
@@ -71,7 +82,13 @@ def err(*messages, _origin=None, _category=None, _src=None, **named_items):
     _log(messages, named_items, origin=_origin, category=_category, level=L_ERR, src=_src)
 
 def _log(messages=[], named_items={}, origin=None, category=None, level=L_LOG, src=None):
-    if origin is None:
+    # bail out before the costly origin and src lookups if nothing will be logged
+    if not _any_target_would_log(level):
+        return
+    if category is not None:
+        _check_category(category)
+    # the origin is needed to pick the category, otherwise only if it is shown
+    if origin is None and (category is None or LogTarget.any_logs_origin):
         origin = Origin.find_on_stack()
     if category is None and isinstance(origin, Origin):
         category = origin._log_category
@@ -79,8 +96,11 @@ def _log(messages=[], named_items={}, origin=None, category=None, level=L_LOG, s
         # two levels up
         src = 2
     if isinstance(src, int):
-        src = get_src_from_caller(src + 1)
-    for target in LogTarget.all_targets:
+        if LogTarget.any_logs_src:
+            src = get_src_from_caller(src + 1)
+        else:
+            src = None
+    for target in LogTarget.targets:
         target.log(origin, category, level, src, messages, named_items)
 
 
@@ -91,10 +111,16 @@ DATEFMT = '%H:%M:%S.%f'
 get_process_id = lambda: '%d-%d' % (os.getpid(), time.time())
 
 class Error(Exception):
+    # (frame, origin) found on the stack when raised from that frame, reused by
+    # Origin.find_in_exc_info() to avoid walking the same stack again
+    _found_on_stack = None
+
     def __init__(self, *messages, origin=None, **named_items):
         msg = ''
         if origin is None:
-            origin = Origin.find_on_stack(f=sys._getframe(1))
+            f = sys._getframe(1)
+            origin = Origin.find_on_stack(f=f)
+            self._found_on_stack = (f, origin)
         if origin:
             msg += origin.name() + ': '
         msg += compose_message(messages, named_items)
@@ -105,6 +131,11 @@ class Error(Exception):
 
 class LogTarget:
     all_targets = []
+    # immutable copy of all_targets to iterate over, updated on add and remove
+    targets = ()
+    # whether any target shows origins / source lines, see targets_changed()
+    any_logs_origin = False
+    any_logs_src = False
 
     do_log_time = None
     do_log_category = None
@@ -116,9 +147,34 @@ class LogTarget:
     origin_width = None
     origin_fmt = None
     all_levels = None
-
-    # redirected by logging test
-    get_time_str = lambda self: datetime.now().strftime(self.log_time_fmt)
+    # lowest level enabled in any category, see would_log()
+    min_level = L_LOG
+    # effective level per category and for all other categories, merged from
+    # all_levels and category_levels, see is_enabled()
+    _effective_levels = {}
+    _default_level = L_LOG
+
+    # second resolution part of the timestamp, see get_time_str()
+    _time_sec = None
+    _time_prefix = None
+    _time_suffix = None
+
+    def get_time_str(self):
+        '''Format the current time with log_time_fmt. strftime() is costly, so
+        only format once per second and fill in the microseconds for %f.'''
+        if self._time_fmt_split is None:
+            return datetime.now().strftime(self.log_time_fmt)
+        t = time.time()
+        sec = int(t)
+        if sec != self._time_sec:
+            lt = time.localtime(sec)
+            fmt_pre, fmt_post = self._time_fmt_split
+            self._time_prefix = time.strftime(fmt_pre, lt)
+            self._time_suffix = time.strftime(fmt_post, lt) if fmt_post is not None else None
+            self._time_sec = sec
+        if self._time_suffix is None:
+            return self._time_prefix
+        return '%s%06d%s' % (self._time_prefix, int((t - sec) * 1000000), self._time_suffix)
 
     # sink that gets each complete logging line
     log_write_func = None
@@ -132,9 +188,11 @@ class LogTarget:
         self.category_levels = {}
         self.style()
         LogTarget.all_targets.append(self)
+        LogTarget.targets_changed()
 
     def remove(self):
         LogTarget.all_targets.remove(self)
+        LogTarget.targets_changed()
 
     def style(self, time=True, time_fmt=DATEFMT, category=True, level=True, origin=True, origin_width=32, src=True, trace=False, all_origins_on_levels=(L_ERR, L_LOG, L_DBG, L_TRACEBACK)):
         '''
@@ -153,6 +211,8 @@ class LogTarget:
         self.do_log_time = bool(time)
         if not self.log_time_fmt:
             self.do_log_time = False
+        self._time_fmt_split = _split_time_fmt(self.log_time_fmt) if self.do_log_time else None
+        self._time_sec = None
         self.do_log_category = bool(category)
         self.do_log_level = bool(level)
         self.do_log_origin = bool(origin)
@@ -161,8 +221,26 @@ class LogTarget:
         self.do_log_src = src
         self.do_log_traceback = trace
         self.do_log_all_origins_on_levels = tuple(all_origins_on_levels or [])
+        # format string for the line prefix, so log() needs no per-line joining
+        pre_fmt = []
+        if self.do_log_time:
+            pre_fmt.append('%s')
+        if self.do_log_category:
+            pre_fmt.append('%s')
+        if self.do_log_origin:
+            pre_fmt.append('%%%ds' % self.origin_width if self.origin_width > 0 else '%s')
+        self.log_pre_fmt = (' '.join(pre_fmt) + ': ') if pre_fmt else ''
+        LogTarget.targets_changed()
         return self
 
+    @staticmethod
+    def targets_changed():
+        'Update the class wide summary of all targets after adding, removing or styling one.'
+        LogTarget.targets = tuple(LogTarget.all_targets)
+        LogTarget.any_logs_origin = any(t.do_log_origin for t in LogTarget.targets)
+        LogTarget.any_logs_src = any(t.do_log_src for t in LogTarget.targets)
+        _update_dbg_enabled()
+
     def style_change(self, time=None, time_fmt=None, category=None, level=None, origin=None, origin_width=None, src=None, trace=None, all_origins_on_levels=None):
         'modify only the given aspects of the logging format'
         self.style(
@@ -180,31 +258,39 @@ class LogTarget:
 
     def set_level(self, category, level):
         'set global logging log.L_* level for a given log.C_* category'
+        _check_category(category)
         self.category_levels[category] = level
+        self._update_levels()
         return self
 
     def set_all_levels(self, level):
         self.all_levels = level
+        self._update_levels()
         return self
 
+    def _update_levels(self):
+        if self.all_levels is not None:
+            self._effective_levels = {}
+            self._default_level = self.all_levels
+        else:
+            self._effective_levels = {c: l for c, l in self.category_levels.items() if l is not None}
+            self._default_level = L_LOG
+        self.min_level = min([self._default_level] + list(self._effective_levels.values()))
+        _update_dbg_enabled()
+
+    def would_log(self, level):
+        'Return whether a message of given level may be logged in any category.'
+        if level == L_TRACEBACK:
+            return self.do_log_traceback
+        return level >= self.min_level
+
     def is_enabled(self, category, level):
         if level == L_TRACEBACK:
             return self.do_log_traceback
-        if self.all_levels is not None:
-            is_level = self.all_levels
-        else:
-            is_level = self.category_levels.get(category)
-        if is_level is None:
-            is_level = L_LOG
-        if level < is_level:
-            return False
-        return True
+        return level >= self._effective_levels.get(category, self._default_level)
 
     def log(self, origin, category, level, src, messages, named_items):
-        if category and len(category) != 3:
-            self.log_write_func('WARNING: INVALID LOGGING CATEGORY %r\n' % category)
-            self.log_write_func('origin=%r category=%r level=%r\n' % (origin, category, level));
-
+        # category was validated when it entered, see _check_category()
         if not category:
             category = C_DEFAULT
         if not self.is_enabled(category, level):
@@ -230,28 +316,26 @@ class LogTarget:
                 name = origin or None
             if not name:
                 name = str(origin.__class__.__name__)
-            log_pre.append(self.origin_fmt.format(name))
+            log_pre.append(name)
 
         if self.do_log_level and level != L_LOG:
             loglevel = '%s: ' % (level_str(level) or ('loglevel=' + str(level)))
         else:
             loglevel = ''
 
-        log_line = [compose_message(messages, named_items)]
+        msg = compose_message(messages, named_items)
 
+        suffix = ''
         if deeper_origins and (level in self.do_log_all_origins_on_levels):
-            log_line.append(' [%s]' % deeper_origins)
+            suffix = '  [%s]' % deeper_origins
 
         if self.do_log_src and src:
-            log_line.append(' [%s]' % str(src))
+            suffix += '  [%s]' % src
 
-        log_str = '%s%s%s%s' % (' '.join(log_pre),
-                              ': ' if log_pre else '',
-                              loglevel,
-                              ' '.join(log_line))
+        # the message is only at the end of the line without [...] suffixes
+        eol = '' if (not suffix and msg.endswith('\n')) else '\n'
 
-        if not log_str.endswith('\n'):
-            log_str = log_str + '\n'
+        log_str = f'{self.log_pre_fmt % tuple(log_pre)}{loglevel}{msg}{suffix}{eol}'
         self.log_write_func(log_str)
 
     def large_separator(self, *msgs, sublevel=1, space_above=True):
@@ -274,9 +358,56 @@ class LogTarget:
         return ''
 
 
+def is_enabled(category, level):
+    'Return whether any log target would output a message of given category and level.'
+    if not category:
+        category = C_DEFAULT
+    for target in LogTarget.targets:
+        if target.is_enabled(category, level):
+            return True
+    return False
+
+def _check_category(category):
+    if category and len(category) != 3:
+        raise RuntimeError('Invalid logging category %r, must have three letters' % category)
+
+def _split_time_fmt(time_fmt):
+    '''Split a strftime format at its %f into (before, after), or return
+    (time_fmt, None) if it has no %f. Return None for formats get_time_str()
+    can't split up, which are then passed to datetime.strftime() as a whole.'''
+    if '%%' in time_fmt or time_fmt.count('%f') > 1:
+        return None
+    if '%f' not in time_fmt:
+        return (time_fmt, None)
+    return tuple(time_fmt.split('%f'))
+
+def _update_dbg_enabled():
+    global dbg, DBG_ENABLED
+    DBG_ENABLED = _any_target_would_log(L_DBG)
+    if DBG_ENABLED:
+        dbg = _dbg
+        Origin.dbg = Origin._dbg
+    else:
+        dbg = _dbg_disabled
+        Origin.dbg = Origin._dbg_disabled
+
+def _any_target_would_log(level):
+    for target in LogTarget.targets:
+        if target.would_log(level):
+            return True
+    return False
+
+_level_strs = {
+        L_DBG: 'DBG',
+        L_LOG: 'LOG',
+        L_ERR: 'ERR',
+        L_TRACEBACK: L_TRACEBACK,
+    }
+
 def level_str(level):
-    if level == L_TRACEBACK:
-        return L_TRACEBACK
+    s = _level_strs.get(level)
+    if s is not None:
+        return s
     if level <= L_DBG:
         return 'DBG'
     if level <= L_LOG:
@@ -288,41 +419,57 @@ def _log_all_targets(origin, category, level, src, messages, named_items=None):
         origin = Origin.find_on_stack()
     if isinstance(src, int):
         src = get_src_from_caller(src + 1)
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.log(origin, category, level, src, messages, named_items)
 
 def large_separator(*msgs, sublevel=1, space_above=True):
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.large_separator(*msgs, sublevel=sublevel, space_above=space_above)
 
+# co_filename -> basename, there is only one entry per source file
+_basename_cache = {}
+
 def get_src_from_caller(levels_up=1):
     # Poke into internal to avoid hitting the linecache which will make one or
     # more calls to stat(2).
     frame = sys._getframe(levels_up)
-    return '%s:%d' % (os.path.basename(frame.f_code.co_filename), frame.f_lineno)
+    fn = frame.f_code.co_filename
+    bn = _basename_cache.get(fn)
+    if bn is None:
+        bn = _basename_cache[fn] = os.path.basename(fn)
+    return '%s:%d' % (bn, frame.f_lineno)
 
 def get_src_from_exc_info(exc_info=None, levels_up=1):
     if exc_info is None:
         exc_info = sys.exc_info()
-    ftb = traceback.extract_tb(exc_info[2])
-    f,l,m,c = ftb[-levels_up]
-    f = os.path.basename(f)
-    return '%s:%s: %s' % (f, l, c)
+    # Walk the traceback by hand, traceback.extract_tb() would read the source
+    # line of every frame from the linecache; only one is needed.
+    tbs = []
+    tb = exc_info[2]
+    while tb is not None:
+        tbs.append(tb)
+        tb = tb.tb_next
+    tb = tbs[-levels_up]
+    path = tb.tb_frame.f_code.co_filename
+    c = linecache.getline(path, tb.tb_lineno, tb.tb_frame.f_globals).strip()
+    return '%s:%s: %s' % (os.path.basename(path), tb.tb_lineno, c)
 
 def get_line_for_src(src_path):
     '''find a given source file on the stack and return the line number for
     that file. (Used to indicate the position in a test script.)'''
-    etype, exception, tb = sys.exc_info()
-    if tb:
-        ftb = traceback.extract_tb(tb)
-        for f,l,m,c in ftb:
-            if f.endswith(src_path):
-                return l
-
-    for frame in stack():
-        caller = getframeinfo(frame[0])
-        if caller.filename.endswith(src_path):
-            return caller.lineno
+    # Walk frames by hand instead of using inspect.stack() or
+    # traceback.extract_tb(), which read source lines via the linecache.
+    tb = sys.exc_info()[2]
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename.endswith(src_path):
+            return tb.tb_lineno
+        tb = tb.tb_next
+
+    f = sys._getframe(1)
+    while f is not None:
+        if f.f_code.co_filename.endswith(src_path):
+            return f.f_lineno
+        f = f.f_back
     return None
 
 def ctx(*name_items, **detail_items):
@@ -346,6 +493,56 @@ def ctx_obj(origin_or_str):
         raise Error('Don\'t use log.ctx(self), it\'s not needed!')
     f.f_locals[LOG_CTX_VAR] = origin_or_str
 
+class CtxScope:
+    '''Log context valid for the duration of a with-block, see ctx_scope().'''
+    __slots__ = ('frame', 'name_items', 'detail_items', '_log_ctx')
+
+    def __init__(self, frame, name_items, detail_items):
+        self.frame = frame
+        self.name_items = name_items
+        self.detail_items = detail_items
+        self._log_ctx = None
+
+    def log_ctx(self):
+        'Return the Origin or string to use as context, composed on first use'
+        if self._log_ctx is None:
+            if not self.detail_items and len(self.name_items) == 1 and isinstance(self.name_items[0], Origin):
+                self._log_ctx = self.name_items[0]
+            else:
+                self._log_ctx = compose_message(self.name_items, self.detail_items)
+        return self._log_ctx
+
+    def __enter__(self):
+        _active_ctx_scopes().append(self)
+        return self
+
+    def __exit__(self, etype, exc, tb):
+        _active_ctx_scopes().pop()
+        if exc is not None:
+            # keep the context for log_exn() once the stack is unwound
+            scopes = getattr(exc, LOG_CTX_VAR, None)
+            if scopes is None:
+                scopes = []
+                setattr(exc, LOG_CTX_VAR, scopes)
+            scopes.append(self)
+        return False
+
+_ctx_scopes = threading.local()
+
+def _active_ctx_scopes():
+    scopes = getattr(_ctx_scopes, 'scopes', None)
+    if scopes is None:
+        scopes = _ctx_scopes.scopes = []
+    return scopes
+
+def ctx_scope(*name_items, **detail_items):
+    '''Like ctx(), but the context only applies within a with-block:
+         with log.ctx_scope(key=key):
+             ...
+    Nothing is stored in the calling frame, and the message is only composed
+    if an origin is actually looked up, so this is cheap enough for loops.'''
+    return CtxScope(sys._getframe(1), name_items, detail_items)
+
 class OriginLoopError(Error):
     pass
 
@@ -363,25 +560,45 @@ class Origin:
     '''
 
     _global_id = None
+    # bumped whenever any origin changes its name or parent, to invalidate the
+    # cached ancestry of all origins
+    _generation = 0
 
     _name = None
     _origin_id = None
     _log_category = None
     _parent = None
+    _ancestry_cache = None
 
     @staticmethod
-    def find_on_stack(except_obj=None, f=None):
+    def find_on_stack(except_obj=None, f=None, exc_ctx_scopes=None):
         if f is None:
             f = sys._getframe(2)
+        # ctx_scope()s, innermost first: those already left by an exception
+        # being handled, then the currently active ones. Group them by frame
+        # once, instead of scanning all of them for every frame:
+        scopes_by_frame = {}
+        for scope in itertools.chain(exc_ctx_scopes or (), reversed(_active_ctx_scopes())):
+            scopes_by_frame.setdefault(scope.frame, []).append(scope)
         log_ctx_obj = None
         origin = None
         while f is not None:
+            # f_locals is still needed for every frame to find 'self'
             l = f.f_locals
+            obj = l.get('self')
 
-            # if there is a log_ctx in the scope, add it, pointing to the next
-            # actual Origin class in the stack
+            frame_scopes = scopes_by_frame.get(f)
+            log_ctxs = [scope.log_ctx() for scope in frame_scopes] if frame_scopes else []
             log_ctx = l.get(LOG_CTX_VAR)
             if log_ctx:
+                log_ctxs.append(log_ctx)
+
+            # if there is a log_ctx in the scope, add it, pointing to the next
+            # actual Origin class in the stack
+            for log_ctx in log_ctxs:
+                if log_ctx is obj:
+                    # same as ctx(self), not needed
+                    continue
                 if isinstance(log_ctx, Origin):
                     new_log_ctx_obj = log_ctx
                 else:
@@ -391,7 +608,6 @@ class Origin:
                 else:
                     log_ctx_obj.highest_ancestor()._set_parent(new_log_ctx_obj)
 
-            obj = l.get('self')
             if obj and isinstance(obj, Origin) and (except_obj is not obj):
                 origin = obj
                 break
@@ -419,7 +635,12 @@ class Origin:
         # get last tb ... I hope that's right
         while tb.tb_next:
             tb = tb.tb_next
-        return Origin.find_on_stack(f=tb.tb_frame)
+        found = getattr(exc_info[1], '_found_on_stack', None)
+        if found is not None and found[0] is tb.tb_frame:
+            # an Error that already looked up its origin from the same frame
+            return found[1]
+        return Origin.find_on_stack(f=tb.tb_frame,
+                                    exc_ctx_scopes=getattr(exc_info[1], LOG_CTX_VAR, None))
 
     def __init__(self, category, *name_items, find_parent=True, **detail_items):
         self._set_log_category(category)
@@ -435,6 +656,7 @@ class Origin:
                 raise OriginLoopError('Origin parent loop')
             p = p._parent
         self._parent = parent
+        Origin._generation += 1
 
     def set_name(self, *name_items, **detail_items):
         '''Change the origin's name for log output; rather use the constructor.
@@ -452,6 +674,7 @@ class Origin:
         else:
             details = ''
         self._name = name + details
+        Origin._generation += 1
 
     def name(self):
         return self._name or self.__class__.__name__
@@ -473,9 +696,15 @@ class Origin:
         return self._origin_id
 
     def _set_log_category(self, category):
+        _check_category(category)
         self._log_category = category
 
-    def ancestry(self):
+    def _get_ancestry_cache(self):
+        '''Return (origins tuple, ancestry str or None), the str is only cached
+        when no origin in the chain overrides src()'''
+        cache = self._ancestry_cache
+        if cache is not None and cache[0] == Origin._generation:
+            return cache[1], cache[2]
         origins = []
         n = 10
         origin = self
@@ -485,23 +714,48 @@ class Origin:
             n -= 1
             if n < 0:
                 break
-        return origins
+        origins = tuple(origins)
+        if all(type(o).src is Origin.src and type(o).name is Origin.name for o in origins):
+            ancestry_str = '↪'.join([o.src() for o in origins])
+        else:
+            ancestry_str = None
+        self._ancestry_cache = (Origin._generation, origins, ancestry_str)
+        return origins, ancestry_str
+
+    def ancestry(self):
+        return list(self._get_ancestry_cache()[0])
 
     def ancestry_str(self):
-        return '↪'.join([o.src() for o in self.ancestry()])
+        origins, ancestry_str = self._get_ancestry_cache()
+        if ancestry_str is None:
+            ancestry_str = '↪'.join([o.src() for o in origins])
+        return ancestry_str
 
     def highest_ancestor(self):
         if self._parent:
             return self._parent.highest_ancestor()
         return self
 
+    def is_dbg_enabled(self):
+        '''Return whether dbg() on this object would output anything. Useful to
+        skip building expensive debug messages.'''
+        if not DBG_ENABLED:
+            return False
+        return is_enabled(self._log_category, L_DBG)
+
     def log(self, *messages, _src=3, **named_items):
         '''same as log.log() but passes this object to skip looking up an origin'''
         log(*messages, _origin=self, _src=_src, **named_items)
 
     def dbg(self, *messages, _src=3, **named_items):
         '''same as log.dbg() but passes this object to skip looking up an origin'''
-        dbg(*messages, _origin=self, _src=_src, **named_items)
+        _dbg(*messages, _origin=self, _src=_src, **named_items)
+
+    # Origin.dbg is swapped between these, see _update_dbg_enabled()
+    _dbg = dbg
+
+    def _dbg_disabled(self, *messages, **named_items):
+        pass
 
     def err(self, *messages, _src=3, **named_items):
         '''same as log.err() but passes this object to skip looking up an origin'''
@@ -531,19 +785,19 @@ def log_exn():
 
 
 def set_all_levels(level):
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.set_all_levels(level)
 
 def set_level(category, level):
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.set_level(category, level)
 
 def style(**kwargs):
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.style(**kwargs)
 
 def style_change(**kwargs):
-    for target in LogTarget.all_targets:
+    for target in LogTarget.targets:
         target.style_change(**kwargs)
 
 class TestsTarget(LogTarget):
@@ -553,42 +807,101 @@ class TestsTarget(LogTarget):
         self.style(time=False, src=False, origin_width=0)
 
 class FileLogTarget(LogTarget):
-    'LogTarget to log to a file system path'
-    log_file = None
+    '''LogTarget to log to a file system path. Lines are collected and written
+    out in batches, see flush().'''
+    fd = None
+    # write out collected lines once this many characters have piled up, or at
+    # the latest this many seconds after the first one was collected
+    FLUSH_SIZE = 64 * 1024
+    FLUSH_INTERVAL = 1.0
 
     def __init__(self, log_path):
         atexit.register(self.at_exit)
         self.path = log_path
-        self.log_file = open(log_path, 'a')
+        # Raw fd in append mode: no Python level buffering on top of our own,
+        # and each flush() is appended atomically.
+        self.fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._buf = []
+        self._buf_len = 0
+        # Lines may also be logged from other threads (e.g. util.FileWatch),
+        # and the flush timer runs in its own thread:
+        self._lock = threading.Lock()
+        self._flush_timer = None
         super().__init__(self.write_to_log_and_flush)
 
     def remove(self):
         super().remove()
-        self.log_file.close()
-        self.log_file = None
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self.fd is None:
+                return
+            self._flush_locked()
+            os.close(self.fd)
+            self.fd = None
 
     def write_to_log_and_flush(self, msg):
-        self.log_file.write(msg)
-        self.log_file.flush()
+        with self._lock:
+            self._buf.append(msg)
+            self._buf_len += len(msg)
+            if self._buf_len >= self.FLUSH_SIZE:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                # don't keep lines in memory while nothing else gets logged,
+                # e.g. during a long MainLoop.wait():
+                self._flush_timer = threading.Timer(self.FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        'Write all collected lines to the log file.'
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._buf or self.fd is None:
+            return
+        # Encode the whole batch in one go, the lines are kept as str until
+        # here so there is no per line encoding work.
+        data = ''.join(self._buf).encode('utf-8', 'replace')
+        self._buf = []
+        self._buf_len = 0
+        written = os.write(self.fd, data)
+        if written < len(data):
+            data = memoryview(data)
+            while written < len(data):
+                written += os.write(self.fd, data[written:])
+
+    def log(self, origin, category, level, src, messages, named_items):
+        super().log(origin, category, level, src, messages, named_items)
+        # make sure errors hit the disk right away
+        if level == L_TRACEBACK or level >= L_ERR:
+            self.flush()
 
     def at_exit(self):
-        if self.log_file is not None:
-            self.log_file.flush()
-            self.log_file.close()
+        self.close()
 
     def log_file_path(self):
+        self.flush()
         return self.path
 
     def get_mark(self):
         if self.path is None:
             return 0
+        self.flush()
         # return current file length
-        with open(self.path, 'r') as logfile:
-            return logfile.seek(0, 2)
+        if self.fd is not None:
+            return os.fstat(self.fd).st_size
+        return os.stat(self.path).st_size
 
     def get_output(self, since_mark=0):
         if self.path is None:
             return ''
+        self.flush()
         with open(self.path, 'r') as logfile:
             if since_mark:
                 logfile.seek(since_mark)
@@ -601,15 +914,39 @@ def run_logging_exceptions(func, *func_args, return_on_failure=None, **func_kwar
         log_exn()
         return return_on_failure
 
+# frozenset of dict keys -> tuple of the same keys sorted; the same few key
+# sets come up over and over in log calls
+_sorted_keys_cache = {}
+_SORTED_KEYS_CACHE_MAX = 1024
+
+def _sorted_keys(d):
+    keys = frozenset(d)
+    sorted_keys = _sorted_keys_cache.get(keys)
+    if sorted_keys is None:
+        if len(_sorted_keys_cache) >= _SORTED_KEYS_CACHE_MAX:
+            _sorted_keys_cache.clear()
+        sorted_keys = _sorted_keys_cache[keys] = tuple(sorted(keys))
+    return sorted_keys
+
 def _compose_named_items(item):
     'make sure dicts are output sorted, for test expectations'
+    t = type(item)
+    if t is str or t is int or t is bool or t is float:
+        return repr(item)
     if is_dict(item):
         return '{%s}' % (', '.join(
-               ['%s=%s' % (k, _compose_named_items(v))
-                for k,v in sorted(item.items())]))
+               ['%s=%s' % (k, _compose_named_items(item[k]))
+                for k in _sorted_keys(item)]))
     return repr(item)
 
 def compose_message(messages, named_items):
+    if not named_items:
+        # common case, e.g. log('some text'), avoid building a list
+        if len(messages) == 1:
+            m = messages[0]
+            return m if type(m) is str else str(m)
+        return ' '.join(map(str, messages))
+
     msgs = [str(m) for m in messages]
 
     if named_items:
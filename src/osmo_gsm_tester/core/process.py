@@ -19,6 +19,8 @@
 
 import os
 import time
+import glob
+import atexit
 import subprocess
 import signal
 from abc import ABCMeta, abstractmethod
@@ -27,7 +29,7 @@ import re
 
 from . import log
 from .event_loop import MainLoop
-from .util import Dir
+from .util import Dir, get_tempdir
 
 class TerminationStrategy(log.Origin, metaclass=ABCMeta):
     """A baseclass for terminating a collection of processes."""
@@ -175,7 +177,7 @@ class Process(log.Origin):
 
     def launch(self):
         preexec_fn = None
-        log.dbg('cd %r; %s %s' % (
+        self.dbg('cd %r; %s %s' % (
                 os.path.abspath(str(self.run_dir)),
                 ' '.join(['%s=%r'%(k,v) for k,v in self.popen_kwargs.get('env', {}).items()]),
                 ' '.join(self.popen_args)))
@@ -433,10 +435,46 @@ class Process(log.Origin):
         msg = '%s: local process exited with status %d' % (msg_prefix, self.result)
         return log.Error(msg)
 
+SSH_CONTROL_PERSIST = 60 # seconds
+_ssh_mux_exit_registered = False
+
+def ssh_mux_opts():
+    '''
+    ssh/scp options to share one master connection per remote user@host:port
+    among short ssh and scp sessions started by osmo-gsm-tester, so that only
+    the first one pays for the full connection setup and key exchange. The
+    master is kept in background for a while after its last session ends, and
+    told to exit when osmo-gsm-tester exits.
+    Long running sessions must not use these: sshd limits the sessions per
+    connection (MaxSessions, 10 by default).
+    '''
+    global _ssh_mux_exit_registered
+    # get_tempdir() registers its removal at exit first, so that the masters
+    # are stopped (atexit handlers run in reverse order) before their sockets
+    # are removed:
+    control_dir = get_tempdir()
+    if not _ssh_mux_exit_registered:
+        atexit.register(ssh_mux_exit_all)
+        _ssh_mux_exit_registered = True
+    return ['-o', 'ControlMaster=auto',
+            '-o', 'ControlPath=%s' % os.path.join(control_dir, 'ssh-%C'),
+            '-o', 'ControlPersist=%d' % SSH_CONTROL_PERSIST]
+
+def ssh_mux_exit_all():
+    '''Tell all ssh master connections started via ssh_mux_opts() to exit.'''
+    for control_path in glob.glob(os.path.join(get_tempdir(), 'ssh-*')):
+        try:
+            # the destination is not used, the master is picked by -S:
+            subprocess.run(['ssh', '-S', control_path, '-O', 'exit', 'ssh-mux'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+        except Exception:
+            pass
+
 class RemoteProcess(Process):
 
     def __init__(self, name, run_dir, remote_user, remote_host, remote_cwd, popen_args,
-                 remote_env={}, remote_port=None, **popen_kwargs):
+                 remote_env={}, remote_port=None, ssh_mux=False, **popen_kwargs):
+        '''Pass ssh_mux=True for short commands only, see ssh_mux_opts().'''
         super().__init__(name, run_dir, popen_args, **popen_kwargs)
         self.remote_user = remote_user
         self.remote_host = remote_host
@@ -454,7 +492,7 @@ class RemoteProcess(Process):
         # We need double -t to force tty and be able to forward signals to
         # processes (SIGHUP) when we close ssh on the local side. As a result,
         # stderr seems to be merged into stdout in ssh client.
-        self.popen_args = ['ssh', '-t', '-t', self.remote_user+'@'+self.remote_host,
+        self.popen_args = ['ssh'] + (ssh_mux_opts() if ssh_mux else []) + ['-t', '-t', self.remote_user+'@'+self.remote_host,
                            '%s %s %s' % (cd,
                                          ' '.join(['%s=%r'%(k,v) for k,v in self.remote_env.items()]),
                                          ' '.join(self.popen_args))]
@@ -516,6 +554,39 @@ def run_local_sync(run_dir, name, popen_args):
     proc.launch_sync()
     return proc
 
+def run_local(run_dir, name, popen_args):
+    'Same as run_local_sync() but return the launched process without waiting for it.'
+    run_dir =run_dir.new_dir(name)
+    proc = Process(name, run_dir, popen_args)
+    proc.launch()
+    return proc
+
+def wait_all_sync(procs, raise_nonsuccess=True):
+    '''
+    Block waiting for all launched processes in procs to finish, serving the
+    mainloop meanwhile. All of them are polled in the same wait loop, so that
+    if any of them fails, the remaining ones are terminated right away.
+    '''
+    def all_terminated():
+        done = True
+        for proc in procs:
+            if not proc.terminated():
+                done = False
+            elif raise_nonsuccess and proc.result != 0:
+                return True
+        return done
+
+    try:
+        MainLoop.wait(all_terminated, timeout=max(proc.default_wait_timeout for proc in procs))
+        if raise_nonsuccess:
+            for proc in procs:
+                if proc.result is not None and proc.result != 0:
+                    raise proc.RunError('wait_all_sync()')
+    except Exception as e:
+        for proc in procs:
+            proc.terminate()
+        raise e
+
 def run_local_netns_sync(run_dir, name, netns, popen_args):
     run_dir =run_dir.new_dir(name)
     proc = NetNSProcess(name, run_dir, netns, popen_args)
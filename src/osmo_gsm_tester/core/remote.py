@@ -130,10 +130,17 @@ class RemoteHost(log.Origin):
         return process.RemoteNetNSProcess(name, run_dir, self.user(), self.host(), self.cwd(), netns, popen_args, **popen_kwargs)
 
     def run_remote_sync(self, name, popen_args):
-        proc = self.RemoteProcess(name, popen_args, remote_env=self.remote_env)
+        # short commands only, share the ssh connection to the host:
+        proc = self.RemoteProcess(name, popen_args, remote_env=self.remote_env, ssh_mux=True)
         proc.launch_sync()
         return proc
 
+    def run_remote_launch(self, name, popen_args):
+        'Same as run_remote_sync() but return the launched process without waiting for it.'
+        proc = self.RemoteProcess(name, popen_args, remote_env=self.remote_env, ssh_mux=True)
+        proc.launch()
+        return proc
+
     def rm_remote_dir(self, remote_dir):
         remote_dir_str = str(remote_dir)
         self.run_remote_sync('rm-remote-dir', ('test', '!', '-d', remote_dir_str, '||', 'rm', '-rf', remote_dir_str))
@@ -143,8 +150,9 @@ class RemoteHost(log.Origin):
         self.run_remote_sync('mk-remote-dir', ('mkdir', '-p', remote_dir_str))
 
     def recreate_remote_dir(self, remote_dir):
-        self.rm_remote_dir(remote_dir)
-        self.create_remote_dir(remote_dir)
+        remote_dir_str = str(remote_dir)
+        # rm + mkdir in one go to avoid an extra ssh session:
+        self.run_remote_sync('recreate-remote-dir', ('rm', '-rf', remote_dir_str, '&&', 'mkdir', '-p', remote_dir_str))
 
     def inst_compatible_for_remote(self):
         proc = self.run_remote_sync('uname-m', ('uname', '-m'))
@@ -152,11 +160,22 @@ class RemoteHost(log.Origin):
             return True
         return False
 
+    def _scp_args(self, src, dst):
+        return ['scp'] + process.ssh_mux_opts() + ['-r', src, dst]
+
     def scp(self, name, local_path, remote_path):
-        process.run_local_sync(self.run_dir, name, ('scp', '-r', local_path, '%s@%s:%s' % (self.user(), self.host(), remote_path)))
+        process.run_local_sync(self.run_dir, name, self._scp_args(local_path, '%s@%s:%s' % (self.user(), self.host(), remote_path)))
+
+    def scp_launch(self, name, local_path, remote_path):
+        'Same as scp() but return the launched scp process without waiting for it.'
+        return process.run_local(self.run_dir, name, self._scp_args(local_path, '%s@%s:%s' % (self.user(), self.host(), remote_path)))
 
     def scpfrom(self, name, remote_path, local_path):
-        process.run_local_sync(self.run_dir, name, ('scp', '-r', '%s@%s:%s' % (self.user(), self.host(), remote_path), local_path))
+        process.run_local_sync(self.run_dir, name, self._scp_args('%s@%s:%s' % (self.user(), self.host(), remote_path), local_path))
+
+    def scpfrom_launch(self, name, remote_path, local_path):
+        'Same as scpfrom() but return the launched scp process without waiting for it.'
+        return process.run_local(self.run_dir, name, self._scp_args('%s@%s:%s' % (self.user(), self.host(), remote_path), local_path))
 
     def setcap_net_admin(self, binary_path):
         '''
@@ -18,9 +18,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import copy
+import stat
 import atexit
 import pprint
+import pickle
 
 from . import log
 from . import config
@@ -44,6 +45,10 @@ R_MODEM = 'modem'
 R_OSMOCON = 'osmocon_phone'
 R_ENB = 'enb'
 
+# config_path -> (st_mtime_ns, hashed Resources), to avoid parsing and
+# validating the same resources.conf for each ResourcesPool
+_resources_conf_cache = {}
+
 class ResourcesPool(log.Origin):
     _remember_to_free = None
     _registered_exit_handler = False
@@ -56,15 +61,37 @@ class ResourcesPool(log.Origin):
         self.read_conf()
 
     def read_conf(self):
-        self.all_resources = Resources(config.read(self.config_path, schema.get_resources_schema()) or {})
-        self.all_resources.set_hashes()
+        mtime_ns = os.stat(self.config_path).st_mtime_ns
+        cached = _resources_conf_cache.get(self.config_path)
+        if cached is None or cached[0] != mtime_ns:
+            all_resources = Resources(config.read(self.config_path, schema.get_resources_schema()) or {}, do_copy=False)
+            all_resources.set_hashes()
+            cached = (mtime_ns, all_resources)
+            _resources_conf_cache[self.config_path] = cached
+        # hand out a copy, the cached one must stay pristine
+        self.all_resources = Resources(cached[1])
+
+    def read_reserved(self, rrfile_path):
+        '''Return the currently reserved resources from the state file. Must be
+        called with the state dir locked. The file is parsed every time: it is
+        small, and it is how several osmo-gsm-tester processes coordinate, so
+        no possibly stale copy of it may be used.'''
+        return Resources(config.read(rrfile_path, if_missing_return={}), do_copy=False)
+
+    def write_reserved(self, rrfile_path, reserved):
+        'Write the reserved resources state file. Must be called with the state dir locked.'
+        # all items originate from config.read() of resources.conf or of the
+        # state file, plus the RESERVED_KEY string, so already standardized.
+        # Pass a plain dict, YAML would tag the Resources class otherwise:
+        config.write(rrfile_path, dict(reserved), standardized=True)
 
     # Used by FileWatch in reserve() method below
     def reserve_resources_fw_cb(self, event):
-        if event.event_type == 'modified':
+        # config.write() replaces the file by renaming a temp file onto it
+        if event.event_type in ('modified', 'moved'):
             self.reserved_modified = True
 
-    def reserve(self, origin, want, modifiers):
+    def reserve(self, origin, want, modifiers, _skip_validate=False):
         '''
         attempt to reserve the resources specified in the dict 'want' for
         'origin'. Obtain a lock on the resources lock dir, verify that all
@@ -95,9 +122,14 @@ class ResourcesPool(log.Origin):
            'arfcn': [ { 'band': 'GSM-1800' }, { 'band': 'GSM-1800' } ],
            'modem': [ {}, {} ],
          }
+
+        Pass _skip_validate=True if 'want' and 'modifiers' were already
+        validated, e.g. as part of a suite or scenario conf.
         '''
-        schema.validate(want, schema.get_resources_schema())
-        schema.validate(modifiers, schema.get_resources_schema())
+        if not _skip_validate:
+            resources_schema = schema.get_resources_schema()
+            schema.validate(want, resources_schema)
+            schema.validate(modifiers, resources_schema)
 
         origin_id = origin.origin_id()
 
@@ -126,12 +158,12 @@ class ResourcesPool(log.Origin):
                 # possible to allocate them now:
                 try:
                     with self.state_dir.lock(origin_id):
-                        reserved = Resources(config.read(rrfile_path, if_missing_return={}))
+                        reserved = self.read_reserved(rrfile_path)
                         to_be_reserved = self.all_resources.without(reserved).find(origin, want)
                         to_be_reserved.mark_reserved_by(origin_id)
                         reserved.add(to_be_reserved)
                         fw.stop()
-                        config.write(rrfile_path, reserved)
+                        self.write_reserved(rrfile_path, reserved)
                         self.remember_to_free(to_be_reserved)
                         return ReservedResources(self, origin, to_be_reserved, modifiers)
                 except NoResourceExn:
@@ -142,9 +174,9 @@ class ResourcesPool(log.Origin):
         log.ctx(origin)
         with self.state_dir.lock(origin.origin_id()):
             rrfile_path = self.state_dir.mk_parentdir(RESERVED_RESOURCES_FILE)
-            reserved = Resources(config.read(rrfile_path, if_missing_return={}))
+            reserved = self.read_reserved(rrfile_path)
             reserved.drop(to_be_freed)
-            config.write(rrfile_path, reserved)
+            self.write_reserved(rrfile_path, reserved)
             self.forget_freed(to_be_freed)
 
     def register_exit_handler(self):
@@ -162,45 +194,68 @@ class ResourcesPool(log.Origin):
     def clean_up_registered_resources(self):
         if not self._remember_to_free:
             return
-        self.free(log.Origin('atexit.clean_up_registered_resources()'),
-                  self._remember_to_free)
+        origin = log.Origin(log.C_CNF, 'atexit.clean_up_registered_resources()')
+        for reserved in list(self._remember_to_free):
+            self.free(origin, reserved)
 
     def remember_to_free(self, to_be_reserved):
         self.register_exit_handler()
         if not self._remember_to_free:
-            self._remember_to_free = Resources()
-        self._remember_to_free.add(to_be_reserved)
+            self._remember_to_free = []
+        # keep a reference only, to_be_reserved is not modified after reserve()
+        self._remember_to_free.append(to_be_reserved)
 
     def forget_freed(self, freed):
-        if freed is self._remember_to_free:
-            self._remember_to_free.clear()
-        else:
-            self._remember_to_free.drop(freed)
+        # freed is one of the objects passed to remember_to_free(), see
+        # ReservedResources.free() and clean_up_registered_resources()
+        self._remember_to_free = [reserved for reserved in self._remember_to_free or []
+                                  if reserved is not freed]
         if not self._remember_to_free:
             self.unregister_exit_handler()
 
-    def next_persistent_value(self, token, first_val, validate_func, inc_func, origin):
+    def next_persistent_range(self, token, first_val, validate_func, inc_func, n, origin):
+        '''Same as calling next_persistent_value() n times, but taking the state
+        dir lock and reading/writing the token state file only once. Returns the
+        list of the n allocated values.'''
         origin_id = origin.origin_id()
 
         with self.state_dir.lock(origin_id):
             token_path = self.state_dir.child('last_used_%s.state' % token)
             log.ctx(token_path)
             last_value = first_val
-            if os.path.exists(token_path):
-                if not os.path.isfile(token_path):
+            try:
+                st = os.stat(token_path)
+            except FileNotFoundError:
+                st = None
+            if st is not None:
+                if not stat.S_ISREG(st.st_mode):
                     raise RuntimeError('path should be a file but is not: %r' % token_path)
                 with open(token_path, 'r') as f:
                     last_value = f.read().strip()
                 validate_func(last_value)
 
-            next_value = inc_func(last_value)
-            with open(token_path, 'w') as f:
-                f.write(next_value)
-            return next_value
+            values = []
+            for i in range(n):
+                last_value = inc_func(last_value)
+                values.append(last_value)
+            if values:
+                # replace the file in one go, so that it never is seen empty or
+                # half written:
+                tmp_path = token_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(last_value)
+                os.replace(tmp_path, token_path)
+            return values
+
+    def next_persistent_value(self, token, first_val, validate_func, inc_func, origin):
+        return self.next_persistent_range(token, first_val, validate_func, inc_func, 1, origin)[0]
 
     def next_msisdn(self, origin):
         return self.next_persistent_value('msisdn', '1000', schema.msisdn, util.msisdn_inc, origin)
 
+    def next_msisdn_range(self, origin, n):
+        return self.next_persistent_range('msisdn', '1000', schema.msisdn, util.msisdn_inc, n, origin)
+
     def next_lac(self, origin):
         # LAC=0 has special meaning (MS detached), avoid it
         return self.next_persistent_value('lac', '1', schema.uint16, lambda x: str(((int(x)+1) % pow(2,16)) or 1), origin)
@@ -227,11 +282,24 @@ class ResourcesPool(log.Origin):
 class NoResourceExn(log.Error):
     pass
 
+def clone_resources(resources):
+    '''Copy a dict of lists of resource items deep enough for Resources: new
+    lists and new item dicts, so that items can be added, dropped and marked
+    (RESERVED_KEY, USED_KEY, ...) independently. Values nested inside items are
+    shared and must be treated as read-only, use deepcopy_resources() to
+    modify those.'''
+    return dict([(key, [dict(item) for item in item_list]) for key, item_list in resources.items()])
+
+def deepcopy_resources(obj):
+    '''Same as copy.deepcopy() for the plain data (dicts, lists, strings, ...)
+    of resources, but several times faster.'''
+    return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
 class Resources(dict):
 
     def __init__(self, all_resources={}, do_copy=True):
         if do_copy:
-            all_resources = copy.deepcopy(all_resources)
+            all_resources = clone_resources(all_resources)
         self.update(all_resources)
 
     def drop(self, reserved, fail_if_not_found=True):
@@ -249,32 +317,76 @@ class Resources(dict):
                 self.pop(key)
                 continue
 
+            # map each hash to the indexes of my items having it, to not
+            # scan my_list again for each item to drop
+            idx_by_hash = {}
+            for i in range(len(my_list)):
+                my_hash = my_list[i].get(HASH_KEY)
+                if not my_hash:
+                    raise RuntimeError('Resources.drop() only works with hashed items')
+                idx_by_hash.setdefault(my_hash, []).append(i)
+
+            drop_idx = set()
             for reserved_item in reserved_list:
-                found = False
                 reserved_hash = reserved_item.get(HASH_KEY)
                 if not reserved_hash:
                     raise RuntimeError('Resources.drop() only works with hashed items')
 
-                for i in range(len(my_list)):
-                    my_item = my_list[i]
-                    my_hash = my_item.get(HASH_KEY)
-                    if not my_hash:
-                        raise RuntimeError('Resources.drop() only works with hashed items')
-                    if my_hash == reserved_hash:
-                        found = True
-                        my_list.pop(i)
-                        break
-
-                if fail_if_not_found and not found:
+                idx_list = idx_by_hash.get(reserved_hash)
+                if idx_list:
+                    drop_idx.add(idx_list.pop(0))
+                elif fail_if_not_found:
                     raise RuntimeError('Asked to drop resource from a pool, but the'
                                        ' resource was not found: %s = %r' % (key, reserved_item))
 
+            if drop_idx:
+                my_list[:] = [my_list[i] for i in range(len(my_list)) if i not in drop_idx]
+
             if not my_list:
                 self.pop(key)
         return self
 
     def without(self, reserved):
-        return Resources(self).drop(reserved)
+        '''Return the items of self minus those in reserved, same as
+        Resources(self).drop(reserved), but in one pass and without copying the
+        items: the returned item dicts and unchanged lists are shared with self,
+        so only use the result to find() (copies of) items in it.'''
+        for key, reserved_list in reserved.items():
+            if reserved_list and key not in self:
+                raise RuntimeError('Asked to drop resource from a pool, but the'
+                                   ' resource was not found: %s = %r' % (key, reserved_list[0]))
+
+        available = {}
+        for key, my_list in self.items():
+            reserved_list = reserved.get(key)
+            if reserved_list is None:
+                available[key] = my_list
+                continue
+
+            drop_count = {}
+            for reserved_item in reserved_list:
+                reserved_hash = reserved_item.get(HASH_KEY)
+                if not reserved_hash:
+                    raise RuntimeError('Resources.without() only works with hashed items')
+                drop_count[reserved_hash] = drop_count.get(reserved_hash, 0) + 1
+
+            remaining = []
+            for my_item in my_list:
+                my_hash = my_item.get(HASH_KEY)
+                if not my_hash:
+                    raise RuntimeError('Resources.without() only works with hashed items')
+                if drop_count.get(my_hash):
+                    drop_count[my_hash] -= 1
+                else:
+                    remaining.append(my_item)
+
+            for reserved_item in reserved_list:
+                if drop_count[reserved_item.get(HASH_KEY)]:
+                    raise RuntimeError('Asked to drop resource from a pool, but the'
+                                       ' resource was not found: %s = %r' % (key, reserved_item))
+            if remaining:
+                available[key] = remaining
+        return Resources(available, do_copy=False)
 
     def find(self, for_origin, want, skip_if_marked=None, do_copy=True, raise_if_missing=True, log_label='Reserving'):
         '''
@@ -306,7 +418,8 @@ class Resources(dict):
         config.replicate_times() for more details.
         '''
         matches = {}
-        for key, want_list in sorted(want.items()): # sorted for deterministic test results
+        for key in sorted_kinds(want): # sorted for deterministic test results
+            want_list = want[key]
             # here we have a resource of a given type, e.g. 'bts', with a list
             # containing as many BTSes as the caller wants to reserve/use. Each
             # list item contains specifics for the particular BTS.
@@ -321,15 +434,15 @@ class Resources(dict):
             # first record all matches, so that each requested item has a list
             # of all available resources that match it. Some resources may
             # appear for multiple requested items. Store matching indexes.
+            # With several constrained wanted items, index the candidates'
+            # plain attribute values once instead of matching each pair.
+            if len([want_item for want_item in want_list if want_item]) > 1:
+                index = index_attr_values(my_list)
+            else:
+                index = None
             all_matches = []
             for want_item in want_list:
-                item_match_list = []
-                for i in range(len(my_list)):
-                    my_item = my_list[i]
-                    if skip_if_marked and my_item.get(skip_if_marked):
-                        continue
-                    if item_matches(my_item, want_item):
-                        item_match_list.append(i)
+                item_match_list = match_indexes(my_list, want_item, index, skip_if_marked)
                 if not item_match_list:
                     if raise_if_missing:
                         raise NoResourceExn('No matching resource available for %s = %r'
@@ -365,12 +478,14 @@ class Resources(dict):
     def set_hashes(self):
         for key, item_list in self.items():
             for item in item_list:
+                if HASH_KEY in item:
+                    continue
                 item[HASH_KEY] = util.hash_obj(item, HASH_KEY, RESERVED_KEY, USED_KEY)
 
     def add(self, more):
         if more is self:
             raise RuntimeError('adding a list of resources to itself?')
-        schema.add(self, copy.deepcopy(more))
+        schema.add(self, clone_resources(more))
 
     def mark_reserved_by(self, origin_id):
         for key, item_list in self.items():
@@ -389,46 +504,164 @@ def solve(all_matches):
     solve([ [0, 1, 2],
             [0],
             [0, 2] ]) == [1, 0, 2]
-    '''
-
-    def all_differ(l):
-        return len(set(l)) == len(l)
-
-    def search_in_permutations(fixed=[]):
-        idx = len(fixed)
-        for i in range(len(all_matches[idx])):
-            val = all_matches[idx][i]
-            # don't add a val that's already in the list
-            if val in fixed:
-                continue
-            l = list(fixed)
-            l.append(val)
-            if len(l) == len(all_matches):
-                # found a solution
-                return l
-            # not at the end yet, add next digit
-            r = search_in_permutations(l)
-            if r:
-                # nested search_in_permutations() call found a solution
-                return r
-        # this entire branch yielded no solution
-        return None
 
+    Of all solutions, pick the first one in order of all_matches, i.e. each
+    item gets the first of its indexes that still leaves a solution for the
+    remaining items. Whether one is left is decided by bipartite matching, so
+    this takes polynomial time instead of trying all permutations.
+    '''
     if not all_matches:
         raise RuntimeError('Cannot solve: no candidates')
 
-    solution = search_in_permutations()
-    if not solution:
+    taken = set()
+    if not can_match_all(all_matches, taken):
         raise NotSolvable('The requested resource requirements are not solvable %r'
                           % all_matches)
+
+    solution = []
+    for idx in range(len(all_matches)):
+        for val in all_matches[idx]:
+            if val in taken:
+                continue
+            taken.add(val)
+            if can_match_all(all_matches, taken, start=idx + 1):
+                solution.append(val)
+                break
+            taken.discard(val)
     return solution
 
+def can_match_all(all_matches, taken=(), start=0):
+    '''
+    Return whether each item i (from index start on) can get a different
+    index out of all_matches[i], without using any index in taken. Finds a
+    maximum bipartite matching with augmenting paths (Kuhn's algorithm).
+    '''
+    owner = {} # index -> item currently using it
+
+    def augment(root):
+        # iterative depth first search for an augmenting path; path[n] is the
+        # index tried by stack[n], which leads on to stack[n+1]
+        visited = set()
+        stack = [(root, iter(all_matches[root]))]
+        path = []
+        while stack:
+            item, candidates = stack[-1]
+            for val in candidates:
+                if val in taken or val in visited:
+                    continue
+                visited.add(val)
+                path.append(val)
+                other = owner.get(val)
+                if other is None:
+                    # found a free index, shift all indexes along the path
+                    for (path_item, _), path_val in zip(stack, path):
+                        owner[path_val] = path_item
+                    return True
+                stack.append((other, iter(all_matches[other])))
+                break
+            else:
+                stack.pop()
+                if path:
+                    path.pop()
+        return False
+
+    for item in range(start, len(all_matches)):
+        if not augment(item):
+            return False
+    return True
+
+
+# frozenset of resource kinds -> tuple of the same kinds, sorted
+_sorted_kinds_cache = {}
+
+def sorted_kinds(resources):
+    '''Return the keys of a dict of resource lists in sorted order. There are
+    only few resource kinds and combinations of them, so remember the order.'''
+    kinds = frozenset(resources)
+    sorted_kinds = _sorted_kinds_cache.get(kinds)
+    if sorted_kinds is None:
+        sorted_kinds = _sorted_kinds_cache[kinds] = tuple(sorted(kinds))
+    return sorted_kinds
+
+def index_attr_values(item_list):
+    '''Return a dict mapping (attribute name, value) to the set of indexes of
+    the items in item_list having that value, for plain values only.'''
+    index = {}
+    for i in range(len(item_list)):
+        for attr, val in item_list[i].items():
+            if attr in (HASH_KEY, RESERVED_KEY, USED_KEY) or is_dict(val) or is_list(val):
+                continue
+            index.setdefault((attr, val), set()).add(i)
+    return index
+
+def match_indexes(item_list, want_item, index=None, skip_if_marked=None):
+    '''Return the sorted indexes of all items in item_list that match
+    want_item, see item_matches(). If passed, use index as returned by
+    index_attr_values(item_list) to narrow down candidates.'''
+    if is_dict(want_item) and not want_item:
+        # unconstrained, the common case: anything not marked matches
+        if not skip_if_marked:
+            return list(range(len(item_list)))
+        return [i for i, my_item in enumerate(item_list) if not my_item.get(skip_if_marked)]
+
+    indexes = range(len(item_list))
+    if index is not None and is_dict(want_item):
+        candidates = None
+        rest = {}
+        for attr, val in want_item.items():
+            if val is None or is_dict(val) or is_list(val):
+                rest[attr] = val
+                continue
+            matching = index.get((attr, val), set())
+            candidates = matching if candidates is None else (candidates & matching)
+        if candidates is not None:
+            indexes = sorted(candidates)
+        want_item = rest
+
+    matches = compile_matcher(want_item)
+    item_match_list = []
+    for i in indexes:
+        my_item = item_list[i]
+        if skip_if_marked and my_item.get(skip_if_marked):
+            continue
+        if matches(my_item):
+            item_match_list.append(i)
+    return item_match_list
 
 def contains_hash(list_of_dicts, a_hash):
-    for d in list_of_dicts:
-        if d.get(HASH_KEY) == a_hash:
+    return any(d.get(HASH_KEY) == a_hash for d in list_of_dicts)
+
+def compile_matcher(wanted_item):
+    '''Return a function f(item) returning the same as item_matches(item,
+    wanted_item), for matching many items against the same wanted_item: the
+    structure of wanted_item is walked once here instead of for each item.'''
+    if is_dict(wanted_item):
+        # (key, wanted plain value, None) or (key, None, matcher function),
+        # in the same order item_matches() would check them
+        checks = []
+        for key, wanted_val in wanted_item.items():
+            if is_dict(wanted_val) or is_list(wanted_val):
+                checks.append((key, None, compile_matcher(wanted_val)))
+            else:
+                checks.append((key, wanted_val, None))
+        checks = tuple(checks)
+        def match_dict(item):
+            if not isinstance(item, dict):
+                return False
+            for key, wanted_val, matcher in checks:
+                if matcher is None:
+                    if item.get(key) != wanted_val:
+                        return False
+                elif not matcher(item.get(key)):
+                    return False
             return True
-    return False
+        return match_dict
+
+    if is_list(wanted_item):
+        # list matching depends on the element types of both lists
+        return lambda item: item_matches(item, wanted_item)
+
+    return lambda item: item == wanted_item
 
 def item_matches(item, wanted_item, ignore_keys=None):
     if is_dict(wanted_item):
@@ -479,8 +712,10 @@ class ReservedResources(log.Origin):
         self.resources_pool = resources_pool
         self.origin = origin
         self.reserved_original = reserved
-        self.reserved = copy.deepcopy(self.reserved_original)
+        self.reserved = deepcopy_resources(self.reserved_original)
         config.overlay(self.reserved, modifiers)
+        # whether get() marked any item USED_KEY since the last put_all()
+        self._any_used = False
 
     def __repr__(self):
         return 'resources(%s)=%s' % (self.origin.name(), pprint.pformat(self.reserved))
@@ -527,7 +762,8 @@ class ReservedResources(log.Origin):
         self.dbg(using=pick)
         assert not pick.get(USED_KEY)
         pick[USED_KEY] = True
-        return copy.deepcopy(pick)
+        self._any_used = True
+        return deepcopy_resources(pick)
 
     def put(self, item):
         if not item.get(USED_KEY):
@@ -536,17 +772,19 @@ class ReservedResources(log.Origin):
         if not hash_to_put:
             raise RuntimeError('Can only put() a resource that has a hash marker: %r' % item)
         for key, item_list in self.reserved.items():
-            my_list = self.get(key)
-            for my_item in my_list:
-                if hash_to_put == my_item.get(HASH_KEY):
-                    my_item.pop(USED_KEY)
+            for my_item in item_list:
+                # identical items share the hash, free one that is in use:
+                if hash_to_put == my_item.get(HASH_KEY) and my_item.get(USED_KEY):
+                    del my_item[USED_KEY]
+                    return
 
     def put_all(self):
-        if not self.reserved:
+        if not self._any_used:
             return
         for key, item_list in self.reserved.items():
             for item in item_list:
                 item.pop(USED_KEY, None)
+        self._any_used = False
 
     def free(self):
         if self.reserved_original:
@@ -554,10 +792,7 @@ class ReservedResources(log.Origin):
         self.reserved_original = None
 
     def counts(self):
-        counts = {}
-        for key in self.reserved.keys():
-            counts[key] = self.count(key)
-        return counts
+        return {key: len(item_list or []) for key, item_list in self.reserved.items()}
 
     def count(self, key):
         return len(self.reserved.get(key) or [])
@@ -225,8 +225,8 @@ def add(dest, src):
             if dest_val is None:
                 dest[key] = val
             else:
-                log.ctx(key=key)
-                add(dest_val, val)
+                with log.ctx_scope(key=key):
+                    add(dest_val, val)
         return
     if util.is_list(dest):
         if not util.is_list(src):
@@ -244,12 +244,12 @@ def combine(dest, src):
             raise ValueError('cannot combine dict with a value of type: %r' % type(src))
 
         for key, val in src.items():
-            log.ctx(key=key)
             dest_val = dest.get(key)
             if dest_val is None:
                 dest[key] = val
             else:
-                combine(dest_val, val)
+                with log.ctx_scope(key=key):
+                    combine(dest_val, val)
         return
     if util.is_list(dest):
         if not util.is_list(src):
@@ -261,12 +261,10 @@ def combine(dest, src):
         # For lists of complex objects, we expect them to be sorted lists:
         if t in (dict, list, tuple):
             for i in range(len(dest)):
-                log.ctx(idx=i)
                 src_it = src[i] if i < len(src) else util.empty_instance_type(t)
-                combine(dest[i], src_it)
-            for i in range(len(dest), len(src)):
-                log.ctx(idx=i)
-                dest.append(src[i])
+                with log.ctx_scope(idx=i):
+                    combine(dest[i], src_it)
+            dest.extend(src[len(dest):])
         else: # for lists of basic elements, we handle them as unsorted sets:
             for elem in src:
                 if elem not in dest:
@@ -414,11 +412,8 @@ def register_resource_schema(obj_class_str, obj_attr_dict):
     """
     global _RESOURCES_SCHEMA
     global _RESOURCE_TYPES
-    tmpdict = {}
-    for key, val in obj_attr_dict.items():
-        new_key = '%s[].%s' % (obj_class_str, key)
-        tmpdict[new_key] = val
-    combine(_RESOURCES_SCHEMA, tmpdict)
+    prefix = obj_class_str + '[].'
+    combine(_RESOURCES_SCHEMA, {prefix + key: val for key, val in obj_attr_dict.items()})
     if obj_class_str not in _RESOURCE_TYPES:
         _RESOURCE_TYPES.append(obj_class_str)
 
@@ -427,11 +422,8 @@ def register_config_schema(obj_class_str, obj_attr_dict):
        For instance: register_resource_schema_attributes('bsc', {'net.codec_list[]': schema.CODEC})
     """
     global _CONFIG_SCHEMA, _ALL_SCHEMA
-    tmpdict = {}
-    for key, val in obj_attr_dict.items():
-        new_key = '%s.%s' % (obj_class_str, key)
-        tmpdict[new_key] = val
-    combine(_CONFIG_SCHEMA, tmpdict)
+    prefix = obj_class_str + '.'
+    combine(_CONFIG_SCHEMA, {prefix + key: val for key, val in obj_attr_dict.items()})
     _ALL_SCHEMA = None # reset _ALL_SCHEMA so it is re-generated next time it's requested.
 
 def get_resources_schema():
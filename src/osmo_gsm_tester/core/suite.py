@@ -159,7 +159,10 @@ class SuiteRun(log.Origin):
         if self.reserved_resources:
             raise RuntimeError('Attempt to reserve resources twice for a SuiteRun')
         self.log('reserving resources in', self.resources_pool.state_dir, '...')
-        self.reserved_resources = self.resources_pool.reserve(self, self.resource_requirements(), self.resource_modifiers())
+        # requirements and modifiers were validated when reading the suite and
+        # scenario confs, against the same schema plus the 'times' attribute:
+        self.reserved_resources = self.resources_pool.reserve(self, self.resource_requirements(), self.resource_modifiers(),
+                                                              _skip_validate=True)
         # short summary of labels
         self.log('RESERVED RESOURCES for ' + self.suite_name() + ':\n' + self.reserved_resources.summary_str())
 
@@ -20,6 +20,7 @@
 
 import os
 from mako.lookup import TemplateLookup, Template
+from mako.runtime import Context
 
 from . import log
 from .util import dict2obj
@@ -41,7 +42,10 @@ def set_templates_dir(*templates_dirs):
         if not os.path.isdir(d):
             raise RuntimeError('templates dir is not a dir: %r'
                                % os.path.abspath(d))
-    _lookup = TemplateLookup(directories=templates_dirs)
+    # Compiled templates are kept in the lookup's collection and reused on
+    # every render() call. Since callers reset the lookup whenever a template
+    # file changes, skip the per-render mtime check of the template source.
+    _lookup = TemplateLookup(directories=templates_dirs, filesystem_checks=False)
     _logger = log.Origin(log.C_CNF, 'Templates')
 
 def render(name, values):
@@ -57,6 +61,19 @@ def render(name, values):
 
     return template.render(**dict2obj(values))
 
+def render_to_file(name, values, f):
+    '''Same as render(), but write the rendered result to file object f while
+       it is generated instead of building and returning the whole string.'''
+    global _lookup
+    if _lookup is None:
+        set_templates_dir(default_templates_dir())
+    tmpl_name = name + '.tmpl'
+    log.ctx(tmpl_name)
+    template = _lookup.get_template(tmpl_name)
+    _logger.dbg('rendering', tmpl_name)
+
+    template.render_context(Context(f, **dict2obj(values)))
+
 def render_strbuf_inline(strbuf, values):
     '''Receive a string containing template syntax, and generate output using
        passed values.'''
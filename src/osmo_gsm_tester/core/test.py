@@ -50,6 +50,7 @@ class Test(log.Origin):
         self.fail_message = None
         self.log_targets = []
         self._report_stdout = None
+        self._brief_log_text = None
         self._kpis = None
         self.timeout = int(config_test_specific['timeout']) if 'timeout' in config_test_specific else None
 
@@ -160,9 +161,16 @@ class Test(log.Origin):
         if self._report_stdout is not None:
             return self._report_stdout
         # Otherwise vy default provide the entire test brief log:
+        if self._brief_log_text is not None:
+            return self._brief_log_text
         if len(self.log_targets) == 2 and self.log_targets[1].log_file_path() is not None:
             with open(self.log_targets[1].log_file_path(), 'r') as myfile:
-                return myfile.read()
+                text = myfile.read()
+            # Once the test is done and its log target removed, the file no
+            # longer changes, so don't read it again for each report:
+            if self.status in (Test.PASS, Test.FAIL, Test.SKIP) and self.log_targets[1].fd is None:
+                self._brief_log_text = text
+            return text
         else:
             return 'test log file not available'
 
@@ -57,6 +57,7 @@ class Trial(log.Origin):
         self.dir = util.Dir(self.path)
         self.inst_dir = util.Dir(self.dir.child('inst'))
         self.bin_tars = {}
+        self.insts = {}
         self.suites = []
         self.status = Trial.UNKNOWN
         self._run_dir = None
@@ -159,6 +160,13 @@ class Trial(log.Origin):
     def get_inst(self, bin_name, run_label=None):
         if run_label is None:
             run_label = ''
+        inst_dir = self.insts.get((bin_name, run_label))
+        if inst_dir is None:
+            inst_dir = self._get_inst(bin_name, run_label)
+            self.insts[(bin_name, run_label)] = inst_dir
+        return inst_dir
+
+    def _get_inst(self, bin_name, run_label):
         bin_tar = self.has_bin_tar(bin_name, run_label)
         if not bin_tar:
             raise RuntimeError('No such binary available: %r' % bin_name)
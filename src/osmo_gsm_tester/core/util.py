@@ -18,6 +18,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import re
 import sys
 import time
 import fcntl
@@ -52,9 +53,16 @@ def change_elf_rpath(binary, paths, run_dir):
     This feature can be used to tell the loaded to load the trial libraries, as
     LD_LIBRARY_PATH is disabled for paths with modified capabilities.
     '''
+    proc = change_elf_rpath_launch(binary, paths, run_dir)
+    from .process import wait_all_sync
+    wait_all_sync((proc,))
+
+def change_elf_rpath_launch(binary, paths, run_dir):
+    'Same as change_elf_rpath() but return the launched process without waiting for it.'
     from .process import Process
     proc = Process('patchelf', run_dir, ['patchelf', '--set-rpath', paths, binary])
-    proc.launch_sync()
+    proc.launch()
+    return proc
 
 def ip_to_iface(ip):
     try:
@@ -270,16 +278,19 @@ class Dir():
     def isfile(self, *rel_path):
         return os.path.isfile(self.child(*rel_path))
 
-    def new_child(self, *rel_path):
+    def _new_child_candidates(self, *rel_path):
+        'yield child paths "name.ext", "name_2.ext", "name_3.ext", ...'
         attempt = 1
         prefix, suffix = os.path.splitext(self.child(*rel_path))
         rel_path_fmt = '%s%%s%s' % (prefix, suffix)
         while True:
-            path = rel_path_fmt % (('_%d'%attempt) if attempt > 1 else '')
+            yield rel_path_fmt % (('_%d'%attempt) if attempt > 1 else '')
+            attempt += 1
+
+    def new_child(self, *rel_path):
+        for path in self._new_child_candidates(*rel_path):
             if not os.path.exists(path):
                 break
-            attempt += 1
-            continue
         Dir.ensure_abs_dir_exists(os.path.dirname(path))
         return path
 
@@ -295,9 +306,15 @@ class Dir():
         return path
 
     def new_dir(self, *rel_path):
-        path = self.new_child(*rel_path)
-        Dir.ensure_abs_dir_exists(path)
-        return path
+        # Rather than checking for existence of each candidate first, simply
+        # try to create it: it's one syscall less and free of races.
+        Dir.ensure_abs_dir_exists(os.path.dirname(self.child(*rel_path)))
+        for path in self._new_child_candidates(*rel_path):
+            try:
+                os.mkdir(path)
+                return path
+            except FileExistsError:
+                continue
 
     def __str__(self):
         return self.path
@@ -340,7 +357,9 @@ class FileWatch(FileSystemEventHandler):
     def on_any_event(self, event):
         if event.is_directory:
             return None
-        if os.path.abspath(event.src_path) != os.path.abspath(self.watch_path):
+        # a file replaced by renaming another file onto it shows up as moved:
+        path = getattr(event, 'dest_path', None) or event.src_path
+        if os.path.abspath(path) != os.path.abspath(self.watch_path):
             return None
         self.origin.dbg('FileWatch: received event %r' % event)
         try:
@@ -381,10 +400,23 @@ def _hash_recurse(acc, obj, ignore_keys):
 
     acc.update(str(obj).encode('utf-8'))
 
+# (repr(obj), ignore_keys) -> hash; repr() runs in C and is much cheaper than
+# walking obj in _hash_recurse(). Equal repr means equal plain data content.
+_hash_obj_cache = {}
+_HASH_OBJ_CACHE_MAX = 4096
+
 def hash_obj(obj, *ignore_keys):
+    cache_key = (repr(obj), ignore_keys)
+    h = _hash_obj_cache.get(cache_key)
+    if h is not None:
+        return h
     acc = hashlib.sha1()
     _hash_recurse(acc, obj, ignore_keys)
-    return acc.hexdigest()
+    h = acc.hexdigest()
+    if len(_hash_obj_cache) >= _HASH_OBJ_CACHE_MAX:
+        _hash_obj_cache.clear()
+    _hash_obj_cache[cache_key] = h
+    return h
 
 
 def md5(of_content):
@@ -452,6 +484,19 @@ def input_polling(prompt, poll_func):
     input_thread.join()
     return input_thread.result
 
+_DURATION_RE = re.compile(r'^(\d+)([hm]?)$')
+_DURATION_UNIT_SEC = { '': 1, 'm': 60, 'h': 3600 }
+
+def duration2sec(val):
+    '''Convert a schema.DURATION value, i.e. an amount of seconds or of minutes
+    or hours like '30m' or '2h', to int seconds.'''
+    if not isinstance(val, str):
+        return int(val)
+    m = _DURATION_RE.match(val)
+    if m is None:
+        raise ValueError('Invalid duration value: %r' % val)
+    return int(m.group(1)) * _DURATION_UNIT_SEC[m.group(2)]
+
 def str2bool(val):
     if val is None or not val:
         return False
@@ -18,6 +18,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import copy
+import importlib
 from abc import ABCMeta, abstractmethod
 from ..core import log
 from ..core import config
@@ -67,6 +68,8 @@ class Bts(log.Origin, metaclass=ABCMeta):
         self._num_trx = 1
         self._max_trx = None
         self.overlay_trx_list = []
+        # result of conf_for_bsc_prepare(), reset by any setter it depends on
+        self._bsc_conf_cache = None
         self.testenv = testenv
         self.conf = conf
         self.defaults_cfg_name = defaults_cfg_name
@@ -74,10 +77,10 @@ class Bts(log.Origin, metaclass=ABCMeta):
 
     def _resolve_bts_cfg(self, cfg_name):
         res = None
-        val = config.get_defaults('bsc_bts').get(cfg_name)
+        val = config.get_defaults('bsc_bts', do_copy=False).get(cfg_name)
         if val is not None:
             res = val
-        val = config.get_defaults(self.defaults_cfg_name).get(cfg_name)
+        val = config.get_defaults(self.defaults_cfg_name, do_copy=False).get(cfg_name)
         if val is not None:
             res = val
         val = self.conf.get(cfg_name)
@@ -96,6 +99,7 @@ class Bts(log.Origin, metaclass=ABCMeta):
             self._max_trx = int(val)
         self._validate_new_num_trx(self._num_trx)
         self.overlay_trx_list = [Bts._new_default_trx_cfg() for trx in range(self._num_trx)]
+        self._bsc_conf_cache = None
 
     def _validate_new_num_trx(self, num_trx):
         if self._max_trx is not None and num_trx > self._max_trx:
@@ -103,19 +107,27 @@ class Bts(log.Origin, metaclass=ABCMeta):
 
     @staticmethod
     def _new_default_trx_cfg():
-        return {'timeslot_list':[{} for ts in range(8)]}
+        # one empty dict per each of the 8 timeslots. Spelled out, since a list
+        # display is built a lot faster than a comprehension or a deepcopy:
+        return {'timeslot_list':[{}, {}, {}, {}, {}, {}, {}, {}]}
 
     @staticmethod
     def _trx_list_recreate(trx_list, new_size):
+        'Resize trx_list in place, appending default TRX configs as needed.'
         curr_len = len(trx_list)
         if new_size < curr_len:
-            trx_list = trx_list[0:new_size]
+            del trx_list[new_size:]
         elif new_size > curr_len:
-            for i in range(new_size - curr_len):
-                trx_list.append(Bts._new_default_trx_cfg())
+            trx_list.extend([Bts._new_default_trx_cfg() for i in range(new_size - curr_len)])
         return trx_list
 
     def conf_for_bsc_prepare(self):
+        if self._bsc_conf_cache is None:
+            self._bsc_conf_cache = self._conf_for_bsc_generate()
+        # callers add their own bits to it, hand out a copy:
+        return copy.deepcopy(self._bsc_conf_cache)
+
+    def _conf_for_bsc_generate(self):
         values = config.get_defaults('bsc_bts')
         # Make sure the trx_list is adapted to num of trx configured at runtime
         # to avoid overlay issues.
@@ -123,33 +135,40 @@ class Bts(log.Origin, metaclass=ABCMeta):
         if trx_list and len(trx_list) != self.num_trx():
             values['trx_list'] = Bts._trx_list_recreate(trx_list, self.num_trx())
 
-        bts_defaults = config.get_defaults(self.defaults_cfg_name)
+        # Only values is modified, the bts defaults are merged via overlay_from()
+        # and must stay untouched, hence resize a copy of their trx_list:
+        bts_defaults = config.get_defaults(self.defaults_cfg_name, do_copy=False)
         trx_list = bts_defaults.get('trx_list')
         if trx_list and len(trx_list) != self.num_trx():
-            bts_defaults['trx_list'] = Bts._trx_list_recreate(trx_list, self.num_trx())
+            bts_defaults = dict(bts_defaults)
+            bts_defaults['trx_list'] = Bts._trx_list_recreate(list(trx_list), self.num_trx())
 
-        config.overlay(values, bts_defaults)
+        config.overlay_from(values, bts_defaults)
+        runtime_values = {}
         if self.lac is not None:
-            config.overlay(values, { 'location_area_code': self.lac })
+            runtime_values['location_area_code'] = self.lac
         if self.rac is not None:
-            config.overlay(values, { 'routing_area_code': self.rac })
+            runtime_values['routing_area_code'] = self.rac
         if self.cellid is not None:
-            config.overlay(values, { 'cell_identity': self.cellid })
+            runtime_values['cell_identity'] = self.cellid
         if self.bvci is not None:
-            config.overlay(values, { 'bvci': self.bvci })
-
-        config.overlay(values, { 'emergency_calls_allowed': util.str2bool(values.get('emergency_calls_allowed', 'false')) } )
+            runtime_values['bvci'] = self.bvci
+        runtime_values['emergency_calls_allowed'] = util.str2bool(values.get('emergency_calls_allowed', 'false'))
+        config.overlay(values, runtime_values)
 
-        conf = copy.deepcopy(self.conf)
+        # overlay_from() copies what it takes from conf, only make sure not to
+        # modify self.conf when adapting its trx_list:
+        conf = self.conf
         trx_list = conf.get('trx_list')
         if trx_list and len(trx_list) != self.num_trx():
-            conf['trx_list'] = Bts._trx_list_recreate(trx_list, self.num_trx())
-        config.overlay(values, conf)
+            conf = dict(conf)
+            conf['trx_list'] = Bts._trx_list_recreate(list(trx_list), self.num_trx())
+        config.overlay_from(values, conf)
 
         sgsn_conf = {} if self.sgsn is None else self.sgsn.conf_for_client()
         config.overlay(values, sgsn_conf)
 
-        config.overlay(values, { 'trx_list': self.overlay_trx_list })
+        config.overlay_from(values, { 'trx_list': self.overlay_trx_list })
         return values
 
 ########################
@@ -170,31 +189,37 @@ class Bts(log.Origin, metaclass=ABCMeta):
         'Nothing to do by default. Subclass can override if required.'
         pass
 
+    # BTS type -> (module, class name), imported on first use:
+    KNOWN_BTS_TYPES = {
+        'osmo-bts-sysmo': ('.bts_sysmo', 'SysmoBts'),
+        'osmo-bts-trx': ('.bts_osmotrx', 'OsmoBtsTrx'),
+        'osmo-bts-oc2g': ('.bts_oc2g', 'OsmoBtsOC2G'),
+        'osmo-bts-octphy': ('.bts_octphy', 'OsmoBtsOctphy'),
+        'osmo-bts-virtual': ('.bts_osmovirtual', 'OsmoBtsVirtual'),
+        'nanobts': ('.bts_nanobts', 'NanoBts'),
+    }
+    _classes_by_type = {}
+
+    @staticmethod
+    def _get_class_by_type(bts_type):
+        bts_class = Bts._classes_by_type.get(bts_type)
+        if bts_class is None:
+            known = Bts.KNOWN_BTS_TYPES.get(bts_type)
+            if known is None:
+                return None
+            module_name, class_name = known
+            bts_class = getattr(importlib.import_module(module_name, __package__), class_name)
+            Bts._classes_by_type[bts_type] = bts_class
+        return bts_class
+
     def get_instance_by_type(testenv, conf):
         """Allocate a BTS child class based on type. Opts are passed to the newly created object."""
         bts_type = conf.get('type')
         if bts_type is None:
             raise RuntimeError('BTS type is not defined!')
 
-        if bts_type == 'osmo-bts-sysmo':
-            from .bts_sysmo import SysmoBts
-            bts_class = SysmoBts
-        elif bts_type == 'osmo-bts-trx':
-            from .bts_osmotrx import OsmoBtsTrx
-            bts_class = OsmoBtsTrx
-        elif bts_type == 'osmo-bts-oc2g':
-            from .bts_oc2g import OsmoBtsOC2G
-            bts_class = OsmoBtsOC2G
-        elif bts_type == 'osmo-bts-octphy':
-            from .bts_octphy import OsmoBtsOctphy
-            bts_class = OsmoBtsOctphy
-        elif bts_type == 'osmo-bts-virtual':
-            from .bts_osmovirtual import OsmoBtsVirtual
-            bts_class = OsmoBtsVirtual
-        elif bts_type == 'nanobts':
-            from .bts_nanobts import NanoBts
-            bts_class = NanoBts
-        else:
+        bts_class = Bts._get_class_by_type(bts_type)
+        if bts_class is None:
             raise log.Error('BTS type not supported:', bts_type)
         return bts_class(testenv, conf)
 
@@ -226,18 +251,23 @@ class Bts(log.Origin, metaclass=ABCMeta):
 
     def set_sgsn(self, sgsn):
         self.sgsn = sgsn
+        self._bsc_conf_cache = None
 
     def set_lac(self, lac):
         self.lac = lac
+        self._bsc_conf_cache = None
 
     def set_rac(self, rac):
         self.rac = rac
+        self._bsc_conf_cache = None
 
     def set_cellid(self, cellid):
         self.cellid = cellid
+        self._bsc_conf_cache = None
 
     def set_bvci(self, bvci):
         self.bvci = bvci
+        self._bsc_conf_cache = None
 
     def set_num_trx(self, num_trx):
         assert num_trx > 0
@@ -246,6 +276,7 @@ class Bts(log.Origin, metaclass=ABCMeta):
             return
         self._num_trx = num_trx
         self.overlay_trx_list = Bts._trx_list_recreate(self.overlay_trx_list, num_trx)
+        self._bsc_conf_cache = None
 
     def num_trx(self):
         return self._num_trx
@@ -255,5 +286,6 @@ class Bts(log.Origin, metaclass=ABCMeta):
         assert ts_idx < 8
         schema.phy_channel_config(config) # validation
         self.overlay_trx_list[trx_idx]['timeslot_list'][ts_idx]['phys_chan_config'] = config
+        self._bsc_conf_cache = None
 
 # vim: expandtab tabstop=4 shiftwidth=4
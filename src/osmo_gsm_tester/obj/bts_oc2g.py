@@ -93,7 +93,7 @@ class OsmoBtsOC2G(bts_osmo.OsmoBts):
     def start(self, keepalive=False):
         if self.bsc is None:
             raise RuntimeError('BTS needs to be added to a BSC or NITB before it can be started')
-        log.log('Starting OsmoBtsOC2G to connect to', self.bsc)
+        self.log('Starting OsmoBtsOC2G to connect to', self.bsc)
         self.run_dir = util.Dir(self.testenv.test().get_run_dir().new_dir(self.name()))
         self.configure()
 
@@ -35,14 +35,18 @@ class OsmoBtsOctphy(bts_osmo.OsmoBtsMainUnit):
         super().__init__(testenv, conf, OsmoBtsOctphy.BIN_BTS_OCTPHY, 'osmo_bts_octphy')
         self.run_dir = None
         self.inst = None
+        self.bin_dir = None
+        self.verified_bins = set()
         self.env = {}
         self.values = {}
 
     def launch_process(self, binary_name, *args):
-        binary = os.path.abspath(self.inst.child('bin', binary_name))
+        binary = os.path.join(self.bin_dir, binary_name)
+        if binary not in self.verified_bins:
+            if not os.path.isfile(binary):
+                raise RuntimeError('Binary missing: %r' % binary)
+            self.verified_bins.add(binary)
         run_dir = self.run_dir.new_dir(binary_name)
-        if not os.path.isfile(binary):
-            raise RuntimeError('Binary missing: %r' % binary)
         proc = process.Process(binary_name, run_dir,
                                (binary,) + args,
                                env=self.env)
@@ -59,23 +63,21 @@ class OsmoBtsOctphy(bts_osmo.OsmoBtsMainUnit):
         the current trx.
         '''
         phy_list = []
+        hwaddr_to_idx = {}
         for trx in c.get('trx_list', []):
             hwaddr = trx.get('hw_addr', None)
             netdev = trx.get('net_device', None)
             if hwaddr is None:
                 raise log.Error('Expected hw-addr value not found!')
-            found = False
-            phy_idx = 0
-            for phy in phy_list:
-                if phy['hw_addr'] == hwaddr:
-                    phy['num_instances'] += 1
-                    found = True
-                    break
-                phy_idx += 1
-            if not found:
-                phy_list.append({'hw_addr': hwaddr, 'net_device': netdev, 'num_instances': 1})
+            phy_idx = hwaddr_to_idx.get(hwaddr)
+            if phy_idx is None:
+                phy_idx = len(phy_list)
+                phy_list.append({'hw_addr': hwaddr, 'net_device': netdev, 'num_instances': 0})
+                hwaddr_to_idx[hwaddr] = phy_idx
+            phy = phy_list[phy_idx]
+            phy['num_instances'] += 1
             trx['phy_idx'] = phy_idx
-            trx['instance_idx'] = phy_list[phy_idx]['num_instances'] - 1
+            trx['instance_idx'] = phy['num_instances'] - 1
         c['phy_list'] = phy_list
 
     def configure(self):
@@ -85,23 +87,28 @@ class OsmoBtsOctphy(bts_osmo.OsmoBtsMainUnit):
         self.dbg(config_file=self.config_file)
 
         values = dict(osmo_bts_octphy=config.get_defaults('osmo_bts_octphy'))
-        config.overlay(values, self.testenv.suite().config())
-        config.overlay(values, {
-                        'osmo_bts_octphy': {
-                            'oml_remote_ip': self.bsc.addr(),
-                            'pcu_socket_path': self.pcu_socket_path(),
-                        }
-        })
-        config.overlay(values, { 'osmo_bts_octphy': self.conf })
+        config.overlay_many(values,
+                            self.testenv.suite().config(),
+                            {
+                              'osmo_bts_octphy': {
+                                'oml_remote_ip': self.bsc.addr(),
+                                'pcu_socket_path': self.pcu_socket_path(),
+                              }
+                            },
+                            { 'osmo_bts_octphy': self.conf })
 
         self.allocate_phy_instances(values['osmo_bts_octphy'])
 
-        self.dbg('OSMO-BTS-OCTPHY CONFIG:\n' + pprint.pformat(values))
+        if self.is_dbg_enabled():
+            self.dbg('OSMO-BTS-OCTPHY CONFIG:\n' + pprint.pformat(values))
         self.values = values
         with open(self.config_file, 'w') as f:
-            r = template.render(OsmoBtsOctphy.CONF_BTS_OCTPHY, values)
-            self.dbg(r)
-            f.write(r)
+            if self.is_dbg_enabled():
+                r = template.render(OsmoBtsOctphy.CONF_BTS_OCTPHY, values)
+                self.dbg(r)
+                f.write(r)
+            else:
+                template.render_to_file(OsmoBtsOctphy.CONF_BTS_OCTPHY, values, f)
 
 ########################
 # PUBLIC - INTERNAL API
@@ -121,17 +128,31 @@ class OsmoBtsOctphy(bts_osmo.OsmoBtsMainUnit):
 
         self.log('Starting to connect to', self.bsc)
         self.run_dir = util.Dir(self.testenv.test().get_run_dir().new_dir(self.name()))
-        self.configure()
 
         self.inst = util.Dir(os.path.abspath(self.testenv.suite().trial().get_inst('osmo-bts')))
-        btsoct_path = self.inst.child('bin', OsmoBtsOctphy.BIN_BTS_OCTPHY)
+        self.bin_dir = self.inst.child('bin')
+        btsoct_path = os.path.join(self.bin_dir, OsmoBtsOctphy.BIN_BTS_OCTPHY)
         lib = self.inst.child('lib')
         if not os.path.isdir(lib):
             raise RuntimeError('No lib/ in %r' % self.inst)
 
         # setting capabilities will later disable use of LD_LIBRARY_PATH from ELF loader -> modify RPATH instead.
+        # patchelf rewrites the binary, so it must be done before setcap, but
+        # it can run while we generate the config file:
         self.log('Setting RPATH for', OsmoBtsOctphy.BIN_BTS_OCTPHY)
-        util.change_elf_rpath(btsoct_path, util.prepend_library_path(lib), self.run_dir.new_dir('patchelf'))
+        patchelf_proc = util.change_elf_rpath_launch(btsoct_path, util.prepend_library_path(lib), self.run_dir.new_dir('patchelf'))
+        try:
+            self.configure()
+        except Exception:
+            # don't leave patchelf rewriting the binary behind our back, and
+            # don't kill it halfway through either. Report the configure()
+            # error, not whatever the wait may run into:
+            try:
+                patchelf_proc.wait()
+            except Exception:
+                pass
+            raise
+        process.wait_all_sync((patchelf_proc,))
         # osmo-bty-octphy requires CAP_NET_RAW to open AF_PACKET socket:
         self.log('Applying CAP_NET_RAW capability to', OsmoBtsOctphy.BIN_BTS_OCTPHY)
         util.setcap_net_raw(btsoct_path, self.run_dir.new_dir('setcap_net_raw'))
@@ -18,6 +18,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import shutil
 import tempfile
 from abc import ABCMeta, abstractmethod
 from ..core import log
@@ -88,6 +89,7 @@ class OsmoBtsMainUnit(OsmoBts, metaclass=ABCMeta):
 
     def __init__(self, testenv, conf, name, defaults_cfg_name):
         self.pcu_sk_tmp_dir = None
+        self._pcu_socket_path = None
         super().__init__(testenv, conf, name, defaults_cfg_name)
 
 ########################
@@ -100,19 +102,17 @@ class OsmoBtsMainUnit(OsmoBts, metaclass=ABCMeta):
 
     def cleanup(self):
         if self.pcu_sk_tmp_dir:
-            try:
-                os.remove(self.pcu_socket_path())
-            except OSError:
-                pass
-            os.rmdir(self.pcu_sk_tmp_dir)
+            # Also removes the pcu socket and any other leftovers in it:
+            shutil.rmtree(self.pcu_sk_tmp_dir, ignore_errors=True)
 
     def create_pcu(self):
         return pcu_osmo.OsmoPcu(self.testenv, self, self.conf)
 
     def pcu_socket_path(self):
-        if self.pcu_sk_tmp_dir is None:
+        if self._pcu_socket_path is None:
             self.pcu_sk_tmp_dir = tempfile.mkdtemp('', 'ogtpcusk')
-        return os.path.join(self.pcu_sk_tmp_dir, 'pcu_bts')
+            self._pcu_socket_path = os.path.join(self.pcu_sk_tmp_dir, 'pcu_bts')
+        return self._pcu_socket_path
 
 ###################
 # PUBLIC (test API included)
@@ -30,6 +30,13 @@ class SysmoBts(bts_osmo.OsmoBts):
     REMOTE_DIR = '/osmo-gsm-tester-bts'
     BTS_SYSMO_BIN = 'osmo-bts-sysmo'
     BTS_SYSMO_CFG = 'osmo-bts-sysmo.cfg'
+    REMOTE_RUN_DIR = os.path.join(REMOTE_DIR, BTS_SYSMO_BIN)
+    REMOTE_CFG = os.path.join(REMOTE_RUN_DIR, BTS_SYSMO_CFG)
+    REMOTE_PCU_SOCKET = os.path.join(REMOTE_DIR, 'pcu_bts')
+    # Load FPGA bitstream and DSP firmware with large block writes to the
+    # char devices instead of cat's small ones:
+    RELOAD_DSP_FIRMWARE_CMD = ('"dd if=$(ls /lib/firmware/sysmobts-v?.bit) of=/dev/fpgadl_par0 bs=1M ;'
+                               ' dd if=$(ls /lib/firmware/sysmobts-v?.out) of=/dev/dspdl_dm644x_0 bs=1M"')
 
     def __init__(self, testenv, conf):
         super().__init__(testenv, conf, SysmoBts.BTS_SYSMO_BIN, 'osmo_bts_sysmo')
@@ -54,27 +61,32 @@ class SysmoBts(bts_osmo.OsmoBts):
         self.dbg(config_file=self.config_file)
 
         values = { 'osmo_bts_sysmo': config.get_defaults('osmo_bts_sysmo') }
-        config.overlay(values, self.testenv.suite().config())
-        config.overlay(values, {
-                        'osmo_bts_sysmo': {
-                            'oml_remote_ip': self.bsc.addr(),
-                            'pcu_socket_path': self.pcu_socket_path(),
-                        }
-        })
-        config.overlay(values, { 'osmo_bts_sysmo': self.conf })
-
-        self.dbg('SYSMOBTS CONFIG:\n' + pprint.pformat(values))
+        config.overlay_many(values,
+                            self.testenv.suite().config(),
+                            {
+                              'osmo_bts_sysmo': {
+                                'oml_remote_ip': self.bsc.addr(),
+                                'pcu_socket_path': self.pcu_socket_path(),
+                              }
+                            },
+                            { 'osmo_bts_sysmo': self.conf })
+
+        if self.is_dbg_enabled():
+            self.dbg('SYSMOBTS CONFIG:\n' + pprint.pformat(values))
 
         with open(self.config_file, 'w') as f:
-            r = template.render(SysmoBts.BTS_SYSMO_CFG, values)
-            self.dbg(r)
-            f.write(r)
+            if self.is_dbg_enabled():
+                r = template.render(SysmoBts.BTS_SYSMO_CFG, values)
+                self.dbg(r)
+                f.write(r)
+            else:
+                template.render_to_file(SysmoBts.BTS_SYSMO_CFG, values, f)
 
 ########################
 # PUBLIC - INTERNAL API
 ########################
     def pcu_socket_path(self):
-        return os.path.join(SysmoBts.REMOTE_DIR, 'pcu_bts')
+        return SysmoBts.REMOTE_PCU_SOCKET
 
     def conf_for_bsc(self):
         values = self.conf_for_bsc_prepare()
@@ -93,7 +105,7 @@ class SysmoBts(bts_osmo.OsmoBts):
     def start(self, keepalive=False):
         if self.bsc is None:
             raise RuntimeError('BTS needs to be added to a BSC or NITB before it can be started')
-        log.log('Starting sysmoBTS to connect to', self.bsc)
+        self.log('Starting sysmoBTS to connect to', self.bsc)
         self.run_dir = util.Dir(self.testenv.test().get_run_dir().new_dir(self.name()))
         self.configure()
 
@@ -105,22 +117,24 @@ class SysmoBts(bts_osmo.OsmoBts):
             raise log.Error('No osmo-bts-sysmo binary in', self.inst)
 
         rem_host = remote.RemoteHost(self.run_dir, self.remote_user, self.remote_addr())
-        remote_prefix_dir = util.Dir(SysmoBts.REMOTE_DIR)
-        self.remote_inst = util.Dir(remote_prefix_dir.child(os.path.basename(str(self.inst))))
-        remote_run_dir = util.Dir(remote_prefix_dir.child(SysmoBts.BTS_SYSMO_BIN))
-        remote_config_file = remote_run_dir.child(SysmoBts.BTS_SYSMO_CFG)
-
-        rem_host.recreate_remote_dir(self.remote_inst)
-        rem_host.scp('scp-inst-to-remote', str(self.inst), remote_prefix_dir)
-        rem_host.create_remote_dir(remote_run_dir)
-        rem_host.scp('scp-cfg-to-remote', self.config_file, remote_config_file)
-
-        rem_host.run_remote_sync('reload-dsp-firmware', ('/bin/sh', '-c', '"cat /lib/firmware/sysmobts-v?.bit > /dev/fpgadl_par0 ; cat /lib/firmware/sysmobts-v?.out > /dev/dspdl_dm644x_0"'))
-
-        remote_lib = self.remote_inst.child('lib')
-        remote_binary = self.remote_inst.child('bin', SysmoBts.BTS_SYSMO_BIN)
+        self.remote_inst = util.Dir(os.path.join(SysmoBts.REMOTE_DIR, os.path.basename(str(self.inst))))
+        remote_inst_str = str(self.remote_inst)
+
+        # Each ssh session costs a full handshake on the sysmoBTS, so prepare
+        # the remote dirs in a single one:
+        rem_host.run_remote_sync('prepare-remote',
+                                 ('rm', '-rf', remote_inst_str, '&&',
+                                  'mkdir', '-p', remote_inst_str, SysmoBts.REMOTE_RUN_DIR))
+        # The transfers and the DSP firmware reload are independent from each
+        # other, run them in parallel:
+        process.wait_all_sync((rem_host.scp_launch('scp-inst-to-remote', str(self.inst), SysmoBts.REMOTE_DIR),
+                               rem_host.scp_launch('scp-cfg-to-remote', self.config_file, SysmoBts.REMOTE_CFG),
+                               rem_host.run_remote_launch('reload-dsp-firmware', ('/bin/sh', '-c', SysmoBts.RELOAD_DSP_FIRMWARE_CMD))))
+
+        remote_lib = os.path.join(remote_inst_str, 'lib')
+        remote_binary = os.path.join(remote_inst_str, 'bin', SysmoBts.BTS_SYSMO_BIN)
         args = ('LD_LIBRARY_PATH=%s' % remote_lib,
-         remote_binary, '-c', remote_config_file, '-r', '1',
+         remote_binary, '-c', SysmoBts.REMOTE_CFG, '-r', '1',
          '-i', self.bsc.addr())
 
         if self._direct_pcu_enabled():
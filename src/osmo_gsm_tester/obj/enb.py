@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import importlib
 from abc import ABCMeta, abstractmethod
 from ..core import log, config
 from ..core import schema
@@ -166,13 +167,14 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
             cell[port_name] = base_port + earfcn_li.index(int(cell['dl_earfcn'])) * self.num_ports()
 
     def configure(self, config_specifics_li):
-        values = dict(enb=config.get_defaults('enb'))
-        for config_specifics in config_specifics_li:
-            config.overlay(values, dict(enb=config.get_defaults(config_specifics)))
-        config.overlay(values, dict(enb=self.testenv.suite().config().get('enb', {})))
-        for config_specifics in config_specifics_li:
-            config.overlay(values, dict(enb=self.testenv.suite().config().get(config_specifics, {})))
-        config.overlay(values, dict(enb=self._conf))
+        suite_config = self.testenv.suite().config()
+        srcs = [config.get_defaults(config_specifics, do_copy=False) for config_specifics in config_specifics_li]
+        srcs.append(suite_config.get('enb', {}))
+        srcs.extend([suite_config.get(config_specifics, {}) for config_specifics in config_specifics_li])
+        srcs.append(self._conf)
+        # values is modified further down (and by subclasses), so never let it
+        # share dicts or lists with the defaults, suite config or self._conf:
+        values = dict(enb=config.overlay_many_from(config.get_defaults('enb'), *srcs))
         self._id = int(values['enb'].get('id', None))
         assert self._id is not None
         self._duplex = values['enb'].get('duplex', None)
@@ -181,33 +183,28 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
         assert self._num_prb
         self._txmode = int(values['enb'].get('transmission_mode', None))
         assert self._txmode
-        config.overlay(values, dict(enb={ 'num_ports': self.num_ports() }))
         self._inactivity_timer = int(values['enb'].get('inactivity_timer', None))
         assert self._inactivity_timer
         assert self._epc is not None
-        config.overlay(values, dict(enb={ 'addr': self.addr() }))
-        config.overlay(values, dict(enb={ 'mme_addr': self._epc.addr() }))
-        config.overlay(values, dict(enb={ 'gtp_bind_addr': self._gtp_bind_addr }))
+        config.overlay(values, dict(enb={ 'num_ports': self.num_ports(),
+                                          'addr': self.addr(),
+                                          'mme_addr': self._epc.addr(),
+                                          'gtp_bind_addr': self._gtp_bind_addr }))
         self._num_cells = int(values['enb'].get('num_cells', None))
         self._num_nr_cells = int(values['enb'].get('num_nr_cells', None))
         assert self._num_cells is not None
         assert self._num_nr_cells is not None
 
         # adjust cell_list to num_cells length:
-        len_cell_list = len(values['enb']['cell_list'])
-        if len_cell_list >= self._num_cells:
-            values['enb']['cell_list'] = values['enb']['cell_list'][:self._num_cells]
-        else:
-            raise log.Error('enb.cell_list items (%d) < enb.num_cells (%d) attribute!' % (len_cell_list, self._num_cells))
+        cell_list = values['enb']['cell_list']
+        if len(cell_list) < self._num_cells:
+            raise log.Error('enb.cell_list items (%d) < enb.num_cells (%d) attribute!' % (len(cell_list), self._num_cells))
+        # values owns its cell_list, drop the extra cells in place:
+        del cell_list[self._num_cells:]
         # adjust scell list (to only contain values available in cell_list):
-        cell_id_list = [c['cell_id'] for c in values['enb']['cell_list']]
-        for i in range(len(values['enb']['cell_list'])):
-            scell_list_old = values['enb']['cell_list'][i]['scell_list']
-            scell_list_new = []
-            for scell_id in scell_list_old:
-                if scell_id in cell_id_list:
-                    scell_list_new.append(scell_id)
-            values['enb']['cell_list'][i]['scell_list'] = scell_list_new
+        cell_id_set = frozenset([c['cell_id'] for c in cell_list])
+        for cell in cell_list:
+            cell['scell_list'] = [scell_id for scell_id in cell['scell_list'] if scell_id in cell_id_set]
 
         # Assign ZMQ ports to each Cell/EARFCN.
         if values['enb'].get('rf_dev_type') == 'zmq':
@@ -263,16 +260,11 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
         return self._num_prb
 
     #reference: srsLTE.git srslte_symbol_sz()
-    def num_prb2symbol_sz(self, num_prb):
-        if num_prb == 6:
-            return 128
-        if num_prb == 50:
-            return 768
-        if num_prb == 75:
-            return 1024
-        return 1536
+    # num_prb -> symbol size, any other num_prb uses 1536:
+    PRB_SYMBOL_SZ = { 6: 128, 50: 768, 75: 1024 }
 
-        raise log.Error('invalid num_prb %r', num_prb)
+    def num_prb2symbol_sz(self, num_prb):
+        return eNodeB.PRB_SYMBOL_SZ.get(num_prb, 1536)
 
     def num_prb2base_srate(self, num_prb):
         return self.num_prb2symbol_sz(num_prb) * 15 * 1000
@@ -285,32 +277,37 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
         else:
             ul_rem_addr = self.ue.addr()
 
-        rf_dev_args = 'fail_on_disconnect=true,log_trx_timeout=true,trx_timeout_ms=8000'
+        addr = self.addr()
+        num_ports = self.num_ports()
+        rf_dev_args = ['fail_on_disconnect=true', 'log_trx_timeout=true', 'trx_timeout_ms=8000']
         idx = 0
         cell_list = cfg_values['enb']['cell_list']
         # Define all 8 possible RF ports (2x CA with 2x2 MIMO)
         for cell in cell_list:
-            rf_dev_args += ',tx_port%u=tcp://%s:%u' %(idx, self.addr(), cell['zmq_enb_bind_port'] + 0)
-            if self.num_ports() > 1:
-                rf_dev_args += ',tx_port%u=tcp://%s:%u' %(idx + 1, self.addr(), cell['zmq_enb_bind_port'] + 1)
-            rf_dev_args += ',rx_port%u=tcp://%s:%u' %(idx, ul_rem_addr, cell['zmq_enb_peer_port'] + 0)
-            if self.num_ports() > 1:
-                rf_dev_args += ',rx_port%u=tcp://%s:%u' %(idx + 1, ul_rem_addr, cell['zmq_enb_peer_port'] + 1)
-            idx += self.num_ports()
+            rf_dev_args.append('tx_port%u=tcp://%s:%u' %(idx, addr, cell['zmq_enb_bind_port'] + 0))
+            if num_ports > 1:
+                rf_dev_args.append('tx_port%u=tcp://%s:%u' %(idx + 1, addr, cell['zmq_enb_bind_port'] + 1))
+            rf_dev_args.append('rx_port%u=tcp://%s:%u' %(idx, ul_rem_addr, cell['zmq_enb_peer_port'] + 0))
+            if num_ports > 1:
+                rf_dev_args.append('rx_port%u=tcp://%s:%u' %(idx + 1, ul_rem_addr, cell['zmq_enb_peer_port'] + 1))
+            idx += num_ports
 
         # Only single antenna supported for NR cells
         nr_cell_list = cfg_values['enb']['nr_cell_list']
         for nr_cell in nr_cell_list:
-            rf_dev_args += ',tx_port%u=tcp://%s:%u' % (idx, self.addr(), nr_cell['zmq_enb_bind_port'] + 0)
-            rf_dev_args += ',rx_port%u=tcp://%s:%u' % (idx, ul_rem_addr, nr_cell['zmq_enb_peer_port'] + 0)
+            rf_dev_args.append('tx_port%u=tcp://%s:%u' % (idx, addr, nr_cell['zmq_enb_bind_port'] + 0))
+            rf_dev_args.append('rx_port%u=tcp://%s:%u' % (idx, ul_rem_addr, nr_cell['zmq_enb_peer_port'] + 0))
             idx += 1
 
-        rf_dev_args += ',id=enb,base_srate=' + str(base_srate)
-        return rf_dev_args
+        rf_dev_args.append('id=enb,base_srate=' + str(base_srate))
+        return ','.join(rf_dev_args)
 
     def get_zmq_rf_dev_args_for_ue(self, ue):
         cell_list = self.gen_conf['enb']['cell_list']
-        rf_dev_args = ''
+        ue_addr = ue.addr()
+        addr = self.addr()
+        num_ports = self.num_ports()
+        rf_dev_args = []
         idx = 0
         earfcns_done = []
         for cell in cell_list:
@@ -318,25 +315,41 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
                 if cell['dl_earfcn'] in earfcns_done:
                     continue
                 earfcns_done.append(cell['dl_earfcn'])
-            rf_dev_args += ',tx_port%u=tcp://%s:%u' %(idx, ue.addr(), cell['zmq_ue_bind_port'] + 0)
-            if self.num_ports() > 1:
-                rf_dev_args += ',tx_port%u=tcp://%s:%u' %(idx + 1, ue.addr(), cell['zmq_ue_bind_port'] + 1)
-            rf_dev_args += ',rx_port%u=tcp://%s:%u' %(idx, self.addr(), cell['zmq_ue_peer_port'] + 0)
-            if self.num_ports() > 1:
-                rf_dev_args += ',rx_port%u=tcp://%s:%u' %(idx + 1, self.addr(), cell['zmq_ue_peer_port'] + 1)
-            idx += self.num_ports()
+            rf_dev_args.append('tx_port%u=tcp://%s:%u' %(idx, ue_addr, cell['zmq_ue_bind_port'] + 0))
+            if num_ports > 1:
+                rf_dev_args.append('tx_port%u=tcp://%s:%u' %(idx + 1, ue_addr, cell['zmq_ue_bind_port'] + 1))
+            rf_dev_args.append('rx_port%u=tcp://%s:%u' %(idx, addr, cell['zmq_ue_peer_port'] + 0))
+            if num_ports > 1:
+                rf_dev_args.append('rx_port%u=tcp://%s:%u' %(idx + 1, addr, cell['zmq_ue_peer_port'] + 1))
+            idx += num_ports
 
         # NR cells again only with single antenna support
         nr_cell_list = self.gen_conf['enb']['nr_cell_list']
         for nr_cell in nr_cell_list:
-            rf_dev_args += ',tx_port%u=tcp://%s:%u' %(idx, ue.addr(), nr_cell['zmq_ue_bind_port'] + 0)
-            rf_dev_args += ',rx_port%u=tcp://%s:%u' %(idx, self.addr(), nr_cell['zmq_ue_peer_port'] + 0)
+            rf_dev_args.append('tx_port%u=tcp://%s:%u' %(idx, ue_addr, nr_cell['zmq_ue_bind_port'] + 0))
+            rf_dev_args.append('rx_port%u=tcp://%s:%u' %(idx, addr, nr_cell['zmq_ue_peer_port'] + 0))
             idx += 1
 
-        # remove trailing comma:
-        if rf_dev_args[0] == ',':
-            return rf_dev_args[1:]
-        return rf_dev_args
+        return ','.join(rf_dev_args)
+
+    # ENB type -> (module, class name), imported on first use:
+    KNOWN_ENB_TYPES = {
+        'amarisoftenb': ('.enb_amarisoft', 'AmarisoftENB'),
+        'srsenb': ('.enb_srs', 'srsENB'),
+    }
+    _classes_by_type = {}
+
+    @staticmethod
+    def _get_class_by_type(enb_type):
+        enb_class = eNodeB._classes_by_type.get(enb_type)
+        if enb_class is None:
+            known = eNodeB.KNOWN_ENB_TYPES.get(enb_type)
+            if known is None:
+                return None
+            module_name, class_name = known
+            enb_class = getattr(importlib.import_module(module_name, __package__), class_name)
+            eNodeB._classes_by_type[enb_type] = enb_class
+        return enb_class
 
     def get_instance_by_type(testenv, conf):
         """Allocate a ENB child class based on type. Opts are passed to the newly created object."""
@@ -344,13 +357,8 @@ class eNodeB(log.Origin, metaclass=ABCMeta):
         if enb_type is None:
             raise RuntimeError('ENB type is not defined!')
 
-        if enb_type == 'amarisoftenb':
-            from .enb_amarisoft import AmarisoftENB
-            enb_class = AmarisoftENB
-        elif enb_type == 'srsenb':
-            from .enb_srs import srsENB
-            enb_class = srsENB
-        else:
+        enb_class = eNodeB._get_class_by_type(enb_type)
+        if enb_class is None:
             raise log.Error('ENB type not supported:', enb_type)
         return  enb_class(testenv, conf)
 
@@ -29,6 +29,7 @@ class OsmoHlr(log.Origin):
     config_file = None
     process = None
     next_subscriber_id = 1
+    db_conn = None
 
     def __init__(self, testenv, ip_address):
         super().__init__(log.C_RUN, 'osmo-hlr_%s' % ip_address.get('addr'))
@@ -36,6 +37,7 @@ class OsmoHlr(log.Origin):
         self.config_file = None
         self.process = None
         self.next_subscriber_id = 1
+        self.db_conn = None
         self.testenv = testenv
         self.ip_address = ip_address
 
@@ -104,7 +106,14 @@ class OsmoHlr(log.Origin):
             log.ctx(proc)
             raise log.Error('Exited in error')
 
-    def subscriber_add(self, modem, msisdn=None, algo_str=None):
+    def db(self):
+        'Connection to the HLR database, opened on first use and kept until cleanup()'
+        if self.db_conn is None:
+            self.db_conn = sqlite3.connect(self.db_file)
+        return self.db_conn
+
+    def _subscriber_rows(self, modem, msisdn=None, algo_str=None):
+        'Allocate a subscriber id for modem, return the rows to insert for it'
         if msisdn is None:
             msisdn = modem.msisdn()
         subscriber_id = self.next_subscriber_id
@@ -120,32 +129,49 @@ class OsmoHlr(log.Origin):
 
         self.log('Add subscriber', msisdn=msisdn, imsi=modem.imsi(), subscriber_id=subscriber_id,
                  algo_str=algo_str, algo=algo)
-        conn = sqlite3.connect(self.db_file)
-        try:
-            c = conn.cursor()
-            c.execute('insert into subscriber (id, imsi, msisdn) values (?, ?, ?)',
-                        (subscriber_id, modem.imsi(), modem.msisdn(),))
-            c.execute('insert into auc_2g (subscriber_id, algo_id_2g, ki) values (?, ?, ?)',
-                        (subscriber_id, algo, modem.ki(),))
-            conn.commit()
-        finally:
-            conn.close()
+        return ((subscriber_id, modem.imsi(), modem.msisdn(),),
+                (subscriber_id, algo, modem.ki(),))
+
+    def _subscribers_insert(self, rows):
+        # one transaction for all, commits on success, rolls back on exception:
+        with self.db() as conn:
+            conn.executemany('insert into subscriber (id, imsi, msisdn) values (?, ?, ?)',
+                             [subscriber_row for subscriber_row, auc_2g_row in rows])
+            conn.executemany('insert into auc_2g (subscriber_id, algo_id_2g, ki) values (?, ?, ?)',
+                             [auc_2g_row for subscriber_row, auc_2g_row in rows])
+
+    def subscriber_add(self, modem, msisdn=None, algo_str=None):
+        rows = self._subscriber_rows(modem, msisdn, algo_str)
+        self._subscribers_insert((rows,))
+        subscriber_id = rows[0][0]
         return subscriber_id
 
+    def subscribers_add(self, modems):
+        '''Same as calling subscriber_add(modem) for each of modems, but
+        inserting all of them in one database transaction. Returns the list of
+        subscriber ids.'''
+        all_rows = [self._subscriber_rows(modem) for modem in modems]
+        self._subscribers_insert(all_rows)
+        return [rows[0][0] for rows in all_rows]
+
     def subscriber_delete(self, modem):
         self.log('Add subscriber', imsi=modem.imsi())
-        conn = sqlite3.connect(self.db_file)
-        try:
+        # hlr.sql has unique indexes on subscriber.imsi and auc_2g.subscriber_id,
+        # let sqlite resolve the id instead of fetching it first:
+        with self.db() as conn:
             c = conn.cursor()
-            c.execute('select id from subscriber where imsi = ?', (modem.imsi(),))
-            subscriber_id = c.fetchone()[0]
-            c.execute('delete from subscriber where id = ?', (subscriber_id,))
-            c.execute('delete from auc_2g where subscriber_id = ?', (subscriber_id,))
-            conn.commit()
-        finally:
-            conn.close()
+            c.execute('delete from auc_2g where subscriber_id = (select id from subscriber where imsi = ?)',
+                      (modem.imsi(),))
+            c.execute('delete from subscriber where imsi = ?', (modem.imsi(),))
+            if c.rowcount < 1:
+                raise log.Error('No such subscriber in HLR database', imsi=modem.imsi())
 
     def conf_for_client(self):
         return dict(hlr=dict(ip_address=self.ip_address))
 
+    def cleanup(self):
+        if self.db_conn is not None:
+            self.db_conn.close()
+            self.db_conn = None
+
 # vim: expandtab tabstop=4 shiftwidth=4
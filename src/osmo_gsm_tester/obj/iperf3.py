@@ -19,6 +19,7 @@
 
 import os
 import json
+import mmap
 
 from ..core import log, util, config, process, remote
 from ..core import schema
@@ -36,21 +37,56 @@ def on_register_schemas():
         }
     schema.register_config_schema('iperf3cli', config_schema)
 
+_json_decoder = json.JSONDecoder()
+
 def iperf3_result_to_json(log_obj, data):
     try:
         # Drop non-interesting self-generated output before json:
-        if not data.startswith('{\n'):
-            data = "{\n" + data.split("\n{\n")[1]
+        start = 0 if data.startswith('{\n') else data.index('\n{\n') + 1
         # Sometimes iperf3 provides 2 dictionaries, the 2nd one being an error about being interrupted (by us).
         # json parser doesn't support (raises exception) parsing several dictionaries at a time (not a valid json object).
-        # We are only interested in the first dictionary, the regular results one:
-        data = data.split("\n}")[0] + "\n}"
-        j = json.loads(data)
+        # We are only interested in the first dictionary, the regular results one, so decode only that one
+        # straight from data instead of splitting (copying) the whole output first:
+        j, end = _json_decoder.raw_decode(data, start)
         return j
     except Exception as e:
         log_obj.log('failed parsing iperf3 output: "%s"' % data)
         raise e
 
+def iperf3_result_file_to_json(log_obj, path):
+    '''Same as iperf3_result_to_json() on the contents of file path, but only
+    reading in the first dictionary, the regular results one, not the whole
+    file.'''
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return iperf3_result_to_json(log_obj, '')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0 if mm[:2] == b'{\n' else mm.find(b'\n{\n')
+            end = -1 if start == -1 else mm.find(b'\n}', start)
+            # without a results dictionary to cut out, let the parser complain:
+            data = mm[:] if end == -1 else mm[start:end + 2]
+    return iperf3_result_to_json(log_obj, data.decode())
+
+def fetch_results(*iperf3_objs):
+    '''Retrieve the results of several IPerf3Server and/or IPerf3Client
+    objects, copying back all their remote log files concurrently instead of
+    one after the other. Returns the list of their get_results().
+    The iperf3 sessions themselves don't share the ssh master connection (see
+    process.ssh_mux_opts()), so after runs longer than SSH_CONTROL_PERSIST a
+    copy sets up a new connection; doing them concurrently hides that.'''
+    copying = []
+    procs = []
+    for iperf3_obj in iperf3_objs:
+        proc = iperf3_obj.log_copy_launch()
+        if proc is not None:
+            copying.append(iperf3_obj)
+            procs.append(proc)
+    if procs:
+        process.wait_all_sync(procs)
+        for iperf3_obj in copying:
+            iperf3_obj.log_copied = True
+    return [iperf3_obj.get_results() for iperf3_obj in iperf3_objs]
+
 def print_result_node_udp(result, node_str):
     try:
         sum = result['end']['sum']
@@ -98,6 +134,7 @@ class IPerf3Server(log.Origin):
         self.remote_log_file = None
         self.log_copied = False
         self.logfile_supported = False # some older versions of iperf doesn't support --logfile arg
+        self._results = None # parsed by get_results(), reset when (re)starting
 
     def cleanup(self):
         if self.process is None:
@@ -118,6 +155,7 @@ class IPerf3Server(log.Origin):
     def start(self):
         self.log('Starting iperf3-srv')
         self.log_copied = False
+        self._results = None
         self.run_dir = util.Dir(self.testenv.test().get_run_dir().new_dir(self.name()))
         self.log_file = self.run_dir.new_child(IPerf3Server.LOGFILE)
         if self.runs_locally():
@@ -164,15 +202,26 @@ class IPerf3Server(log.Origin):
     def stop(self):
         self.testenv.stop_process(self.process)
 
+    def log_copy_launch(self):
+        '''Launch copying back the remote log file if get_results() still needs
+        it. Returns the scp process, or None if there's nothing to copy.'''
+        if self._results is not None or not self.logfile_supported or self.runs_locally() or self.log_copied:
+            return None
+        return self.rem_host.scpfrom_launch('scp-back-log', self.remote_log_file, self.log_file)
+
     def get_results(self):
+        # Only the first results dictionary is parsed, which doesn't change
+        # anymore once it could be parsed, so keep it:
+        if self._results is not None:
+            return self._results
         if self.logfile_supported:
             if not self.runs_locally() and not self.log_copied:
                 self.rem_host.scpfrom('scp-back-log', self.remote_log_file, self.log_file)
                 self.log_copied = True
-            with open(self.log_file) as f:
-                return iperf3_result_to_json(self, f.read())
+            self._results = iperf3_result_file_to_json(self, self.log_file)
         else:
-            return iperf3_result_to_json(self, self.process.get_stdout())
+            self._results = iperf3_result_to_json(self, self.process.get_stdout())
+        return self._results
 
     def print_results(self, client_was_udp):
         if client_was_udp:
@@ -228,6 +277,7 @@ class IPerf3Client(log.Origin):
         self.remote_log_file = None
         self.log_copied = False
         self.logfile_supported = False # some older versions of iperf doesn't support --logfile arg
+        self._results = None # parsed by get_results(), reset when (re)starting
         self.is_android_ue = False
 
     def runs_locally(self):
@@ -242,15 +292,7 @@ class IPerf3Client(log.Origin):
             dir = self.DIR_UL
 
         if time_sec is None:
-            time_sec_str = values.get('time', time_sec)
-
-            # Convert duration to seconds
-            if isinstance(time_sec_str, str) and time_sec_str.endswith('h'):
-                time_sec = int(time_sec_str[:-1]) * 3600
-            elif isinstance(time_sec_str, str) and time_sec_str.endswith('m'):
-                time_sec = int(time_sec_str[:-1]) * 60
-            else:
-                time_sec = int(time_sec_str)
+            time_sec = util.duration2sec(values.get('time', time_sec))
         assert(time_sec)
         self._time_sec = time_sec
 
@@ -260,24 +302,26 @@ class IPerf3Client(log.Origin):
 
         self.log('Preparing iperf3-client connecting to %s:%d (proto=%s,time=%ds)' % (self.server.addr(), self.server.port(), self._proto, time_sec))
         self.log_copied = False
+        self._results = None
         self.run_dir = util.Dir(self.testenv.test().get_run_dir().new_dir(self.name()))
         self.log_file = self.run_dir.new_child(IPerf3Client.LOGFILE)
 
-        popen_args = ('iperf3', '-c',  self.server.addr(),
+        # a list, extended in place here and by prepare_test_proc_*():
+        popen_args = ['iperf3', '-c',  self.server.addr(),
                       '-p', str(self.server.port()), '-J',
-                      '-t', str(time_sec))
+                      '-t', str(time_sec)]
         if dir == IPerf3Client.DIR_DL:
-            popen_args += ('-R',)
+            popen_args.append('-R')
         elif dir == IPerf3Client.DIR_BI:
-            popen_args += ('--bidir',)
+            popen_args.append('--bidir')
         if proto == IPerf3Client.PROTO_UDP:
-            popen_args += ('-u', '-b', str(bitrate))
+            popen_args.extend(('-u', '-b', str(bitrate)))
             # Add the buffer length.
             if values.get('packet_length'):
                 packet_length = str(values.get('packet_length'))
-                popen_args += ('-l', packet_length)
+                popen_args.extend(('-l', packet_length))
         if tos is not None:
-            popen_args += ('-S', str(tos))
+            popen_args.extend(('-S', str(tos)))
 
         if self.runs_locally():
             proc = self.prepare_test_proc_locally(netns, popen_args)
@@ -297,7 +341,7 @@ class IPerf3Client(log.Origin):
         self.rem_host.recreate_remote_dir(remote_run_dir)
 
         if self.logfile_supported:
-            popen_args += ('--logfile', self.remote_log_file,)
+            popen_args.extend(('--logfile', self.remote_log_file))
 
         if netns:
             self.process = self.rem_host.RemoteNetNSProcess(self.name(), netns, popen_args, env={})
@@ -310,7 +354,7 @@ class IPerf3Client(log.Origin):
                                    'host %s and port not 22' % self.server.addr(), netns)
 
         if self.logfile_supported:
-            popen_args += ('--logfile', os.path.abspath(self.log_file),)
+            popen_args.extend(('--logfile', os.path.abspath(self.log_file)))
 
         if netns:
             self.process = process.NetNSProcess(self.name(), self.run_dir, netns, popen_args, env={})
@@ -325,15 +369,26 @@ class IPerf3Client(log.Origin):
         self.process.launch_sync()
         return self.get_results()
 
+    def log_copy_launch(self):
+        '''Launch copying back the remote log file if get_results() still needs
+        it. Returns the scp process, or None if there's nothing to copy.'''
+        if self._results is not None or not self.logfile_supported or self.runs_locally() or self.log_copied:
+            return None
+        return self.rem_host.scpfrom_launch('scp-back-log', self.remote_log_file, self.log_file)
+
     def get_results(self):
+        # Only the first results dictionary is parsed, which doesn't change
+        # anymore once it could be parsed, so keep it:
+        if self._results is not None:
+            return self._results
         if self.logfile_supported:
             if not self.runs_locally() and not self.log_copied:
                 self.rem_host.scpfrom('scp-back-log', self.remote_log_file, self.log_file)
                 self.log_copied = True
-            with open(self.log_file) as f:
-                return iperf3_result_to_json(self, f.read())
+            self._results = iperf3_result_file_to_json(self, self.log_file)
         else:
-            return iperf3_result_to_json(self, self.process.get_stdout())
+            self._results = iperf3_result_to_json(self, self.process.get_stdout())
+        return self._results
 
     def print_results(self):
         if self.proto() == self.PROTO_UDP:
@@ -701,8 +701,8 @@ class Modem(MS):
         if not iface:
             raise log.Error('%s Settings contains no iface! %r' % (ctx_id, repr(ctx_settings)))
         util.move_iface_to_netns(iface, self.netns(), self.run_dir.new_dir('move_netns'))
-        self.run_netns_wait('ifup', ('ip', 'link', 'set', 'dev', iface, 'up'))
-        self.run_netns_wait('dhcp', ('udhcpc', '-q', '-i', iface))
+        # Entering the netns (sudo + ip netns exec) is costly, do both steps in one go:
+        self.run_netns_wait('ifup-dhcp', ('sh', '-c', 'ip link set dev "$1" up && udhcpc -q -i "$1"', 'sh', iface))
 
     def sms_send(self, to_msisdn_or_modem, *tokens):
         if isinstance(to_msisdn_or_modem, Modem):
@@ -27,6 +27,16 @@ from .run_node import RunNode
 from .ms import MS
 from .srslte_common import srslte_common
 
+# ZMQ rx/tx frequency args per (num_carriers, enb num_ports), appended to the
+# port args in rf_dev_args (with MIMO both ports of a carrier share its freq):
+ZMQ_RF_FREQ_ARGS = {
+    (1, 1): 'rx_freq0=2630e6,tx_freq0=2510e6',
+    (1, 2): 'rx_freq0=2630e6,rx_freq1=2630e6,tx_freq0=2510e6,tx_freq1=2510e6',
+    (2, 1): 'rx_freq0=2630e6,rx_freq1=2650e6,tx_freq0=2510e6,tx_freq1=2530e6',
+    (2, 2): 'rx_freq0=2630e6,rx_freq1=2630e6,rx_freq2=2650e6,rx_freq3=2650e6,tx_freq0=2510e6,tx_freq1=2510e6,tx_freq2=2530e6,tx_freq3=2530e6',
+    (4, 1): 'rx_freq0=2630e6,rx_freq1=2650e6,rx_freq2=2670e6,rx_freq3=2680e6,tx_freq0=2510e6,tx_freq1=2530e6,tx_freq2=2550e6,tx_freq3=2560e6',
+}
+
 def rf_type_valid(rf_type_str):
     return rf_type_str in ('zmq', 'uhd', 'soapy', 'bladerf')
 
@@ -338,33 +348,15 @@ class srsUE(MS, srslte_common):
             # Define all 8 possible RF ports (2x CA with 2x2 MIMO)
             rf_dev_args = self.enb.get_zmq_rf_dev_args_for_ue(self)
 
-            if self.num_carriers == 1:
-                # Single carrier
-                if self.enb.num_ports() == 1 and self.num_nr_carriers == 0:
-                    # SISO
-                    rf_dev_args += ',rx_freq0=2630e6,tx_freq0=2510e6'
-                elif self.enb.num_ports() == 2:
-                    # MIMO
-                    rf_dev_args += ',rx_freq0=2630e6,rx_freq1=2630e6,tx_freq0=2510e6,tx_freq1=2510e6'
-            elif self.num_carriers == 2:
-                # 2x CA
-                if self.enb.num_ports() == 1:
-                    # SISO
-                    rf_dev_args += ',rx_freq0=2630e6,rx_freq1=2650e6,tx_freq0=2510e6,tx_freq1=2530e6'
-                elif self.enb.num_ports() == 2:
-                    # MIMO
-                    rf_dev_args += ',rx_freq0=2630e6,rx_freq1=2630e6,rx_freq2=2650e6,rx_freq3=2650e6,tx_freq0=2510e6,tx_freq1=2510e6,tx_freq2=2530e6,tx_freq3=2530e6'
-            elif self.num_carriers == 4:
-                # 4x CA
-                if self.enb.num_ports() == 1:
-                    # SISO
-                    rf_dev_args += ',rx_freq0=2630e6,rx_freq1=2650e6,rx_freq2=2670e6,rx_freq3=2680e6,tx_freq0=2510e6,tx_freq1=2530e6,tx_freq2=2550e6,tx_freq3=2560e6'
-                elif self.enb.num_ports() == 2:
-                    # MIMO
-                    raise log.Error("4 carriers with MIMO isn't supported")
-            else:
-                # flag
-                raise log.Error('No rx/tx frequencies given for {} carriers' % self.num_carriers)
+            num_ports = self.enb.num_ports()
+            if self.num_carriers not in (1, 2, 4):
+                raise log.Error('No rx/tx frequencies given for %d carriers' % self.num_carriers)
+            if self.num_carriers == 4 and num_ports == 2:
+                raise log.Error("4 carriers with MIMO isn't supported")
+            freq_args = ZMQ_RF_FREQ_ARGS.get((self.num_carriers, num_ports))
+            # single carrier SISO along with NR carriers gets no LTE frequencies:
+            if freq_args is not None and not (self.num_carriers == 1 and num_ports == 1 and self.num_nr_carriers != 0):
+                rf_dev_args += ',' + freq_args
 
             rf_dev_args += ',id=ue,base_srate='+ str(base_srate)
             config.overlay(values, dict(ue=dict(rf_dev_args=rf_dev_args)))
@@ -84,33 +84,39 @@ class OsmoMsc(log.Origin):
         self.dbg(config_file=self.config_file)
 
         values = dict(msc=config.get_defaults('msc'))
-        config.overlay(values, self.testenv.suite().config())
-        config.overlay(values, dict(msc=dict(ip_address=self.ip_address)))
-        config.overlay(values, self.mgw.conf_for_client())
-        config.overlay(values, self.hlr.conf_for_client())
-        config.overlay(values, self.stp.conf_for_client())
-        config.overlay(values, self.smsc.get_config())
+        config.overlay_many(values,
+                            self.testenv.suite().config(),
+                            dict(msc=dict(ip_address=self.ip_address)),
+                            self.mgw.conf_for_client(),
+                            self.hlr.conf_for_client(),
+                            self.stp.conf_for_client(),
+                            self.smsc.get_config())
 
         # runtime parameters:
         if self.encryption is not None:
             encryption_vty = util.encryption2osmovty(self.encryption)
         else:
             encryption_vty = util.encryption2osmovty(values['msc']['net']['encryption'])
-        config.overlay(values, dict(msc=dict(net=dict(encryption=encryption_vty))))
+        runtime_net = dict(encryption=encryption_vty)
         if self.authentication is not None:
-            config.overlay(values, dict(msc=dict(net=dict(authentication=self.authentication))))
-        config.overlay(values, dict(msc=dict(use_osmux=self.use_osmux)))
+            runtime_net['authentication'] = self.authentication
+        runtime_msc = dict(net=runtime_net, use_osmux=self.use_osmux)
         if self._emergency_call_msisdn is not None:
-            config.overlay(values, dict(msc=dict(emergency_call_msisdn=self._emergency_call_msisdn)))
+            runtime_msc['emergency_call_msisdn'] = self._emergency_call_msisdn
+        config.overlay(values, dict(msc=runtime_msc))
 
         self.config = values
 
-        self.dbg('MSC CONFIG:\n' + pprint.pformat(values))
+        if self.is_dbg_enabled():
+            self.dbg('MSC CONFIG:\n' + pprint.pformat(values))
 
         with open(self.config_file, 'w') as f:
-            r = template.render('osmo-msc.cfg', values)
-            self.dbg(r)
-            f.write(r)
+            if self.is_dbg_enabled():
+                r = template.render('osmo-msc.cfg', values)
+                self.dbg(r)
+                f.write(r)
+            else:
+                template.render_to_file('osmo-msc.cfg', values, f)
 
     def addr(self):
         return self.ip_address.get('addr')
@@ -147,7 +153,7 @@ class OsmoMsc(log.Origin):
 
     def imsi_attached(self, *imsis):
         attached = self.imsi_list_attached()
-        log.dbg('attached:', attached)
+        self.dbg('attached:', attached)
         return all([(imsi in attached) for imsi in imsis])
 
     def imsi_list_attached(self):
@@ -55,14 +55,14 @@ class OsmoPcuSysmo(pcu.Pcu):
         self.run_remote('rm-remote-dir', ('test', '!', '-d', OsmoPcuSysmo.REMOTE_DIR, '||', 'rm', '-rf', OsmoPcuSysmo.REMOTE_DIR))
         self.run_remote('mk-remote-dir', ('mkdir', '-p', OsmoPcuSysmo.REMOTE_DIR))
         self.run_local('scp-inst-to-bts',
-            ('scp', '-r', str(self.inst), '%s@%s:%s' % (self.remote_user, self.bts.remote_addr(), str(self.remote_inst))))
+            ['scp'] + process.ssh_mux_opts() + ['-r', str(self.inst), '%s@%s:%s' % (self.remote_user, self.bts.remote_addr(), str(self.remote_inst))])
 
         remote_run_dir = self.remote_dir.child(OsmoPcuSysmo.PCU_SYSMO_BIN)
         self.run_remote('mk-remote-run-dir', ('mkdir', '-p', remote_run_dir))
 
         remote_config_file = self.remote_dir.child(OsmoPcuSysmo.PCU_SYSMO_CFG)
         self.run_local('scp-cfg-to-sysmobts',
-            ('scp', '-r', self.config_file, '%s@%s:%s' % (self.remote_user, self.bts.remote_addr(), remote_config_file)))
+            ['scp'] + process.ssh_mux_opts() + ['-r', self.config_file, '%s@%s:%s' % (self.remote_user, self.bts.remote_addr(), remote_config_file)])
 
         remote_lib = self.remote_inst.child('lib')
         remote_binary = self.remote_inst.child('bin', OsmoPcuSysmo.PCU_SYSMO_BIN)
@@ -72,13 +72,13 @@ class OsmoPcuSysmo(pcu.Pcu):
              '-i', self.bts.bsc.addr()),
             remote_cwd=remote_run_dir, keepalive=keepalive)
 
-    def _process_remote(self, name, popen_args, remote_cwd=None):
+    def _process_remote(self, name, popen_args, remote_cwd=None, ssh_mux=False):
         run_dir = self.run_dir.new_dir(name)
         return process.RemoteProcess(name, run_dir, self.remote_user, self.bts.remote_addr(), remote_cwd,
-                                     popen_args)
+                                     popen_args, ssh_mux=ssh_mux)
 
     def run_remote(self, name, popen_args, remote_cwd=None):
-        proc = self._process_remote(name, popen_args, remote_cwd)
+        proc = self._process_remote(name, popen_args, remote_cwd, ssh_mux=True)
         proc.launch()
         proc.wait()
         if proc.result != 0:
@@ -203,7 +203,9 @@ class TestEnv(log_module.Origin):
         from .obj.hlr_osmo import OsmoHlr
         if ip_address is None:
             ip_address = self.ip_address()
-        return OsmoHlr(self, ip_address)
+        hlr_obj = OsmoHlr(self, ip_address)
+        self.register_for_cleanup(hlr_obj)
+        return hlr_obj
 
     def ggsn(self, ip_address=None):
         from .obj.ggsn_osmo import OsmoGgsn
@@ -278,6 +280,9 @@ class TestEnv(log_module.Origin):
         l = []
         for i in range(count):
             l.append(self.modem())
+        # allocate all MSISDNs in one go instead of one by one on first use:
+        for ms_obj, msisdn in zip(l, self.msisdns(count)):
+            ms_obj.set_msisdn(msisdn)
         return l
 
     def all_resources(self, resource_func):
@@ -337,6 +342,12 @@ class TestEnv(log_module.Origin):
         self.log('using MSISDN', msisdn)
         return msisdn
 
+    def msisdns(self, count):
+        msisdns = self.suite_run.resource_pool().next_msisdn_range(self, count)
+        if msisdns:
+            self.log('using MSISDNs', msisdns)
+        return msisdns
+
     def lac(self):
         lac = self.suite_run.resource_pool().next_lac(self)
         self.log('using LAC', lac)
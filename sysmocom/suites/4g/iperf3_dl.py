@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 from osmo_gsm_tester.testenv import *
+from osmo_gsm_tester.obj.iperf3 import fetch_results
 import os
 
 # Overlay suite-specific templates folder if it exists
@@ -80,6 +81,8 @@ except Exception as e:
       print("Exception while terminanting process %r" % repr(process))
   raise e
 
+# copy back all remote iperf3 logs at once:
+fetch_results(*(iperf3cli + iperf3srv))
 for n in range(0, nof_ue):
   iperf3cli[n].print_results()
   iperf3srv[n].print_results(iperf3cli[n].proto() == iperf3cli[n].PROTO_UDP)
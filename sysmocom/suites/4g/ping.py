@@ -24,8 +24,10 @@ print('waiting for UE to attach...')
 wait(ue.is_registered)
 print('UE is attached')
 
-# Wait a bit
-sleep(5)
+# Wait until the data plane is ready instead of a fixed delay. A single ping
+# process keeps probing until the first reply (or 15 sec deadline), so the
+# UE netns is entered only once:
+ue.run_netns_wait('ping-probe', ('ping', '-c', '1', '-w', '15', epc.tun_addr()))
 
 proc = ue.run_netns_wait('ping', ('ping', '-c', '10', epc.tun_addr()))
 
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 from osmo_gsm_tester.testenv import *
+from osmo_gsm_tester.obj.iperf3 import fetch_results
 
 def print_results(cli, srv):
+        # copy back both remote iperf3 logs at once:
+        fetch_results(cli, srv)
         cli.print_results()
         srv.print_results(cli.proto() == cli.PROTO_UDP)
 
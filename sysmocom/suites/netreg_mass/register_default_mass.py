@@ -31,8 +31,8 @@ bts.start()
 wait(bsc.bts_is_connected, bts)
 
 # Configure all MS that are available to this test.
+hlr.subscribers_add(modems)
 for modem in modems:
-    hlr.subscriber_add(modem)
     ms_driver.subscriber_add(modem)
 
 # Run the base test.